@@ -0,0 +1,90 @@
+import fnmatch
+import threading
+
+# Document orderings for a batch run
+ORDER_POLICIES = ("folder", "shortest", "largest")
+# What to do with a document whose estimate no longer fits the budget
+BUDGET_ACTIONS = ("defer", "stop")
+
+def order_entries(entries, order="folder", priorities=()):
+    """
+    Sort scanned FileEntry items for processing
+    - priorities: glob patterns on the relative path (e.g. "urgent/*",
+      "*.pdf"); files matching an earlier pattern go first, unmatched last
+    - order: within the same priority, "folder" keeps scan order,
+      "shortest" puts small files first (fastest feedback, most documents
+      per dollar) and "largest" puts big files first
+    File size stands in for text length, which is only known after extraction
+    """
+    def rank(entry):
+        for i, pattern in enumerate(priorities):
+            if fnmatch.fnmatch(entry.rel_path, pattern):
+                return i
+        return len(priorities)
+
+    def key(indexed):
+        index, entry = indexed
+        if order == "shortest":
+            return rank(entry), entry.size, index
+        if order == "largest":
+            return rank(entry), -entry.size, index
+        return rank(entry), index
+
+    return [entry for _, entry in sorted(enumerate(entries), key=key)]
+
+class BudgetGuard:
+    """
+    Keeps a run within a dollar and/or token budget
+    Each document reserves its estimated usage before its requests go
+    out and settles to the actual usage afterwards, so documents in flight
+    at the same time can't overshoot the budget together
+    on_exceed="defer" skips a document that doesn't fit and keeps trying
+    smaller ones; "stop" defers it and everything after it
+    """
+
+    def __init__(self, max_cost=None, max_tokens=None, on_exceed="defer"):
+        self.max_cost = max_cost
+        self.max_tokens = max_tokens
+        self.on_exceed = on_exceed
+        self.spent_cost = 0.0
+        self.spent_tokens = 0
+        self.reserved_cost = 0.0
+        self.reserved_tokens = 0
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def fits(self, tokens, cost):
+        if self.max_cost is not None and self.spent_cost + self.reserved_cost + cost > self.max_cost:
+            return False
+        if self.max_tokens is not None and self.spent_tokens + self.reserved_tokens + tokens > self.max_tokens:
+            return False
+        return True
+
+    def reserve(self, tokens, cost):
+        """Reserve an estimate; False means the document must be deferred"""
+        with self.lock:
+            if self.stopped:
+                return False
+            if not self.fits(tokens, cost):
+                if self.on_exceed == "stop":
+                    self.stopped = True
+                return False
+            self.reserved_tokens += tokens
+            self.reserved_cost += cost
+            return True
+
+    def settle(self, tokens, cost, actual_tokens, actual_cost):
+        """Replace a reservation with what the document actually used"""
+        with self.lock:
+            self.reserved_tokens -= tokens
+            self.reserved_cost -= cost
+            self.spent_tokens += actual_tokens
+            self.spent_cost += actual_cost
+
+    def describe(self):
+        limits = []
+        if self.max_cost is not None:
+            limits.append(f"${self.spent_cost:.6f} of ${self.max_cost:.6f}")
+        if self.max_tokens is not None:
+            limits.append(f"{self.spent_tokens:,} of {self.max_tokens:,} tokens")
+        return ", ".join(limits)
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from llm_client import estimate_tokens, CHARS_PER_TOKEN
+
+# Provider batch jobs are billed at half the normal rate
+BATCH_COST_FACTOR = 0.5
+# Seconds between status checks while waiting for a job
+JOB_POLL_SECONDS = 60
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+def job_line(custom_id, request):
+    """One request in a batch job file"""
+    return {"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": request}
+
+def response_from_body(body):
+    """Chat completion JSON from a job result as a response-shaped object"""
+    return json.loads(json.dumps(body), object_hook=lambda d: SimpleNamespace(**d))
+
+class BatchBackend(ABC):
+    """
+    Where batch job files are run
+    status() returns "pending", "completed" or "failed"; results() yields
+    output lines ({"custom_id", "response": {"status_code", "body"}, "error"})
+    """
+
+    name = None
+
+    @abstractmethod
+    def submit(self, job_path):
+        """Submit a JSONL job file, returning the job id"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def status(self, job_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def results(self, job_id):
+        raise NotImplementedError
+
+class OpenAIBatchBackend(BatchBackend):
+    """The OpenAI Batch API (results within 24h, half price)"""
+
+    name = "openai"
+    FAILED = {"failed", "expired", "cancelled", "cancelling"}
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, job_path):
+        with open(job_path, 'rb') as f:
+            upload = self.client.files.create(file=f, purpose="batch")
+        job = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window="24h"
+        )
+        return job.id
+
+    def status(self, job_id):
+        job = self.client.batches.retrieve(job_id)
+        if job.status == "completed":
+            return "completed"
+        if job.status in self.FAILED:
+            return "failed"
+        return "pending"
+
+    def results(self, job_id):
+        job = self.client.batches.retrieve(job_id)
+        # Requests that errored come back in a separate file
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in for a provider batch API, for offline runs and tests
+    Jobs live in folder/<job id>/; a job completes the first time its status
+    is checked, answering every request with responder(request), which must
+    return the reply text (default: the first lines of the document)
+    """
+
+    name = "local"
+
+    def __init__(self, folder=os.path.join(".cache", "local_batches"), responder=None):
+        self.folder = folder
+        self.responder = responder or first_lines_reply
+
+    def job_folder(self, job_id):
+        return os.path.join(self.folder, job_id)
+
+    def submit(self, job_path):
+        job_id = f"local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self.job_folder(job_id))
+        with open(job_path, 'r', encoding='utf-8') as src, \
+             open(os.path.join(self.job_folder(job_id), "input.jsonl"), 'w', encoding='utf-8') as dst:
+            dst.write(src.read())
+        return job_id
+
+    def status(self, job_id):
+        output_path = os.path.join(self.job_folder(job_id), "output.jsonl")
+        if not os.path.exists(output_path):
+            self.run(job_id, output_path)
+        return "completed"
+
+    def run(self, job_id, output_path):
+        with open(os.path.join(self.job_folder(job_id), "input.jsonl"), 'r', encoding='utf-8') as src, \
+             open(output_path + ".tmp", 'w', encoding='utf-8') as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                task = json.loads(line)
+                reply = self.responder(task["body"])
+                prompt_tokens = sum(estimate_tokens(m["content"]) for m in task["body"]["messages"])
+                completion_tokens = estimate_tokens(reply)
+                body = {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "model": task["body"].get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens}
+                }
+                result = {"custom_id": task["custom_id"], "response": {"status_code": 200, "body": body},
+                          "error": None}
+                dst.write(json.dumps(result, ensure_ascii=False) + "\n")
+        os.replace(output_path + ".tmp", output_path)
+
+    def results(self, job_id):
+        with open(os.path.join(self.job_folder(job_id), "output.jsonl"), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def first_lines_reply(request):
+    """Placeholder reply for the local backend: the start of the document"""
+    content = request["messages"][-1]["content"]
+    document = content.split("Document:\n", 1)[-1]
+    return document[:100 * CHARS_PER_TOKEN].strip()
+
+def make_backend(name, client=None):
+    if name == "local":
+        return LocalBatchBackend()
+    return OpenAIBatchBackend(client)
+
+def wait_for_job(backend, job_id, poll_seconds=JOB_POLL_SECONDS):
+    """Poll until the job finishes; returns its final status"""
+    while True:
+        status = backend.status(job_id)
+        if status != "pending":
+            return status
+        print(f"⏳ Job {job_id} still running, checking again in {poll_seconds}s")
+        time.sleep(poll_seconds)
+
+def save_job_state(path, state):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+
+def load_job_state(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,72 @@
+import os
+import json
+from datetime import datetime
+
+class BatchJournal:
+    """
+    Append-only JSONL record of every processed document
+    One line is written (and flushed to disk) as soon as a document finishes,
+    so a crashed or killed run can be resumed without paying again
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = load_journal(path)
+
+    def completed(self, file_path, content_hash):
+        """Return the earlier successful result for this exact file content, if any"""
+        record = self.records.get(os.path.abspath(file_path))
+        if record and record["content_hash"] == content_hash and record["result"].get("success"):
+            return record["result"]
+        return None
+
+    def known_hash(self, file_path, size, mtime_ns):
+        """Content hash recorded for this file when it had the same size and mtime, or None"""
+        record = self.records.get(os.path.abspath(file_path))
+        if record and record.get("size") == size and record.get("mtime_ns") == mtime_ns:
+            return record["content_hash"]
+        return None
+
+    def append(self, file_path, content_hash, result, size=None, mtime_ns=None):
+        """size/mtime_ns (from the scan the hash was taken after) let known_hash skip re-hashing"""
+        record = {
+            "path": os.path.abspath(file_path),
+            "content_hash": content_hash,
+            "completed_at": datetime.now().isoformat(),
+            "result": result
+        }
+        if size is not None:
+            record["size"] = size
+            record["mtime_ns"] = mtime_ns
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[record["path"]] = record
+
+def load_journal(path):
+    """Read a journal into {absolute path: latest record}, skipping a torn last line"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a partial final line
+                continue
+            records[record["path"]] = record
+    return records
+
+def journal_results(path, folder=None):
+    """Latest (filename, result) per document, optionally only those under `folder`"""
+    prefix = os.path.join(os.path.abspath(folder), "") if folder else None
+    results = []
+    for file_path, record in load_journal(path).items():
+        if prefix and not file_path.startswith(prefix):
+            continue
+        name = os.path.relpath(file_path, folder) if folder else os.path.basename(file_path)
+        results.append((name, record["result"]))
+    return results
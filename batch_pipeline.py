@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Marks the end of a queue's input
+DONE = object()
+# Processes extracting documents ahead of summarization
+DEFAULT_EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+
+class StageStats:
+    """Items processed, time spent and queue depth for one pipeline stage"""
+
+    def __init__(self, name, queue=None, workers=1):
+        self.name = name
+        self.queue = queue
+        self.workers = workers
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.started = time.monotonic()
+
+    def add(self, seconds):
+        self.processed += 1
+        self.busy_seconds += seconds
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def queue_depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def describe(self):
+        text = f"{self.name}: {self.processed} done, {self.throughput():.1f}/s"
+        if self.queue is not None:
+            text += f", queue {self.queue_depth()}/{self.queue.maxsize}"
+        return text
+
+def worker_pool(workers):
+    """
+    Process pool for extraction workers
+    forkserver/spawn start clean processes, so locks held by other threads
+    of this process (caches, the event loop's thread pool) are never inherited
+    """
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+def extract_in_worker(file_path, max_chars):
+    """Runs in a pool process: read one document without console output"""
+    from text_extraction import read_document
+    # Already one document per process, so no nested page-level pool
+    return read_document(file_path, verbose=False, max_chars=max_chars, workers=1)
+
+async def run_workers(stats, fn, in_queue, out_queue, workers):
+    """Run `workers` copies of a stage until its input queue is finished"""
+
+    async def worker():
+        while True:
+            item = await in_queue.get()
+            if item is DONE:
+                return
+            start = time.monotonic()
+            result = await fn(item)
+            stats.add(time.monotonic() - start)
+            if out_queue is not None:
+                # Blocks while the next stage is behind (backpressure)
+                await out_queue.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+async def run_pipeline(source, extract, summarize, write, extract_workers=4, summarize_workers=4,
+                       queue_size=32, progress_interval=10.0):
+    """
+    Staged pipeline: scan -> extract -> summarize -> write
+    - source: iterable of items (e.g. file paths), consumed lazily in a thread
+    - extract / summarize: async functions, run by extract_workers /
+      summarize_workers concurrent workers
+    - write: plain function called for every finished item, one at a time
+    None of the stages may raise: a failure belongs in that item's result,
+    otherwise it aborts the whole run
+    Stages are connected by bounded queues, so a fast stage waits for a slow
+    one instead of piling up work in memory. Returns the list of StageStats
+    """
+    extract_queue = asyncio.Queue(maxsize=queue_size)
+    summarize_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+
+    scan_stats = StageStats("scan")
+    extract_stats = StageStats("extract", extract_queue, extract_workers)
+    summarize_stats = StageStats("summarize", summarize_queue, summarize_workers)
+    write_stats = StageStats("write", write_queue)
+    all_stats = [scan_stats, extract_stats, summarize_stats, write_stats]
+
+    async def scan():
+        iterator = iter(source)
+        while True:
+            start = time.monotonic()
+            item = await asyncio.to_thread(next, iterator, DONE)
+            if item is DONE:
+                break
+            scan_stats.add(time.monotonic() - start)
+            await extract_queue.put(item)
+        for _ in range(extract_workers):
+            await extract_queue.put(DONE)
+
+    async def extract_stage():
+        await run_workers(extract_stats, extract, extract_queue, summarize_queue, extract_workers)
+        for _ in range(summarize_workers):
+            await summarize_queue.put(DONE)
+
+    async def summarize_stage():
+        await run_workers(summarize_stats, summarize, summarize_queue, write_queue, summarize_workers)
+        await write_queue.put(DONE)
+
+    async def write_stage():
+        while True:
+            item = await write_queue.get()
+            if item is DONE:
+                return
+            start = time.monotonic()
+            write(item)
+            write_stats.add(time.monotonic() - start)
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(progress_interval)
+            print("📈 " + " | ".join(stats.describe() for stats in all_stats))
+
+    reporter = asyncio.create_task(report_progress())
+    try:
+        await asyncio.gather(scan(), extract_stage(), summarize_stage(), write_stage())
+    finally:
+        reporter.cancel()
+
+    return all_stats
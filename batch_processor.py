@@ -1,12 +1,50 @@
 import os
 import json
+import time
+import asyncio
+import argparse
 from datetime import datetime
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 from text_extraction import read_document
+from llm_client import (create_chat_completion, acreate_chat_completion, is_cached, lookup_cache,
+                        estimate_tokens, estimate_request_tokens, estimate_cost, response_cost)
+from chunked_summary import map_reduce_summarize, estimate_map_reduce
+from batch_journal import BatchJournal, journal_results
+from extraction_cache import file_hash
+from digest_store import store_summary_digest, wants_digest
+from doc_search import search_index, term_counts
+from result_stream import ResultStreamWriter, iter_results, read_stats
+from batch_pipeline import run_pipeline, worker_pool, extract_in_worker, DEFAULT_EXTRACT_WORKERS
+from summary_request import build_summary_request, MAX_DOCUMENT_CHARS
+from folder_scanner import scan_folder, changed_files, file_entry, FileManifest
+from dedup import DuplicateIndex, fingerprint
+from doc_packing import DocumentPacker, SMALL_DOC_TOKENS, PACK_MAX_DOCS
+from batch_budget import order_entries, BudgetGuard, ORDER_POLICIES, BUDGET_ACTIONS
+from batch_jobs import (make_backend, job_line, response_from_body, wait_for_job, save_job_state,
+                        load_job_state, BATCH_COST_FACTOR, JOB_POLL_SECONDS)
+from work_queue import SQLiteWorkQueue, LeaseKeeper, default_worker_id, LEASE_SECONDS
+from folder_watcher import make_watcher, watch_changes, POLL_INTERVAL, DEBOUNCE_SECONDS
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are handled by the shared scheduler in llm_client
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+# Default number of documents summarized at once in async mode
+DEFAULT_CONCURRENCY = 8
+# Documents allowed to wait between pipeline stages
+PIPELINE_QUEUE_SIZE = 32
+# Per-document journal used by --resume
+JOURNAL_FILE = "batch_journal.jsonl"
+# Processed-file manifest used by --incremental and --watch
+MANIFEST_FILE = os.path.join(".cache", "manifest.sqlite")
+# Results file that --watch keeps appending to
+WATCH_RESULTS_FILE = "watch_results.jsonl"
+
+# Set by start_result_stream(): results go to disk instead of batch_stats["results"]
+result_writer = None
 
 # Batch processing stats
 batch_stats = {
@@ -14,47 +52,89 @@ batch_stats = {
     "successful": 0,
     "failed": 0,
     "total_cost": 0.0,
+    "cache_hits": 0,
+    "resumed": 0,
+    "deferred": 0,
+    "duplicate_groups": {},
     "start_time": None,
     "results": []
 }
 
-def batch_summarize(text, filename):
-    """Summarize a single document in batch mode"""
+def summary_result_from_response(response, filename):
+    """Turn a chat completion response into a batch result dict"""
+    summary = response.choices[0].message.content
+    tokens = response.usage.total_tokens
+    cost = response_cost(response)
     
-    # Truncate if needed
-    text = text[:20000]
-    
-    prompt = """Provide a concise summary of this document.
-Include:
-- Main topic (1 sentence)
-- Key points (3-5 bullet points)
-- Conclusion or outcome (1 sentence)
+    return {
+        "success": True,
+        "filename": filename,
+        "summary": summary,
+        "tokens": tokens,
+        "cost": cost,
+        "cached": is_cached(response)
+    }
 
-Keep it brief and clear."""
+def needs_chunking(text):
+    return len(text) > MAX_DOCUMENT_CHARS
 
+def batch_summarize_chunked(text, filename):
+    """
+    Summarize a whole document with map-reduce instead of truncating it
+    The final request uses the normal batch prompt over the chunk summaries
+    Content-defined chunks mean an edited document only re-pays for the
+    chunks that changed
+    """
+    result = map_reduce_summarize(client, text, build_summary_request, chunking="cdc")
+    result["filename"] = filename
+    return result
+
+def estimate_summary(text, chunked=False):
+    """
+    Estimated (tokens, cost) of batch_summarize on text, before calling the
+    model: estimated prompt plus the full max_tokens of every completion
+    Responses already in the cache (including unchanged chunks) cost nothing
+    Reads the cache, so call it off the event loop
+    """
+    if chunked and needs_chunking(text):
+        prompt, completion = estimate_map_reduce(text, build_summary_request, chunking="cdc")
+    else:
+        request = build_summary_request(text)
+        if lookup_cache(request) is not None:
+            return 0, 0.0
+        completion = request["max_tokens"]
+        prompt = estimate_request_tokens(request) - completion
+    return prompt + completion, estimate_cost(prompt, completion)
+
+def batch_summarize(text, filename, chunked=False):
+    """
+    Summarize a single document in batch mode
+    With chunked=True, documents over MAX_DOCUMENT_CHARS are summarized in full
+    (map-reduce over chunks) instead of being truncated
+    """
+    if chunked and needs_chunking(text):
+        return batch_summarize_chunked(text, filename)
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You create concise, accurate summaries quickly."},
-                {"role": "user", "content": f"{prompt}\n\nDocument:\n{text}"}
-            ],
-            temperature=0.4,
-            max_tokens=300
-        )
-        
-        summary = response.choices[0].message.content
-        tokens = response.usage.total_tokens
-        cost = (response.usage.prompt_tokens / 1000) * 0.00015 + \
-               (response.usage.completion_tokens / 1000) * 0.0006
+        response = create_chat_completion(client, **build_summary_request(text))
+        return summary_result_from_response(response, filename)
         
+    except Exception as e:
         return {
-            "success": True,
+            "success": False,
             "filename": filename,
-            "summary": summary,
-            "tokens": tokens,
-            "cost": cost
+            "error": str(e)
         }
+
+async def batch_summarize_async(text, filename, chunked=False):
+    """Summarize a single document using the async client"""
+    if chunked and needs_chunking(text):
+        # The map step runs its chunks concurrently in a thread pool
+        return await asyncio.to_thread(batch_summarize_chunked, text, filename)
+    
+    try:
+        response = await acreate_chat_completion(async_client, **build_summary_request(text))
+        return summary_result_from_response(response, filename)
         
     except Exception as e:
         return {
@@ -63,79 +143,277 @@ Keep it brief and clear."""
             "error": str(e)
         }
 
-def process_batch(folder_path):
-    """Process all documents in a folder"""
-    
-    print("\n" + "="*70)
-    print("🚀 BATCH PROCESSING STARTED")
-    print("="*70)
-    
-    batch_stats["start_time"] = datetime.now()
-    
-    # Get all files
+def store_result(result):
+    """Keep a result in memory, or write it straight to the result stream"""
+    if result_writer is not None:
+        result_writer.write(result)
+    else:
+        batch_stats["results"].append(result)
+
+def record_result(filename, summary_result):
+    """Add a summary result (or failure) to batch_stats"""
+    if summary_result['success']:
+        batch_stats["successful"] += 1
+        batch_stats["total_cost"] += summary_result['cost']
+        if summary_result.get('cached'):
+            batch_stats["cache_hits"] += 1
+        store_result(summary_result)
+    else:
+        batch_stats["failed"] += 1
+        store_result({
+            "filename": filename,
+            "status": "failed",
+            "error": summary_result['error']
+        })
+
+def reset_batch_stats():
+    """Clear batch_stats before rebuilding them"""
+    batch_stats.update({
+        "total_docs": 0,
+        "successful": 0,
+        "failed": 0,
+        "total_cost": 0.0,
+        "cache_hits": 0,
+        "resumed": 0,
+        "deferred": 0,
+        "duplicate_groups": {},
+        "results": []
+    })
+
+def failure_result(filename, error):
+    return {
+        "success": False,
+        "filename": filename,
+        "error": error
+    }
+
+def document_hash(journal, entry):
+    """
+    Content hash of a scanned file (None if it can't be read)
+    A journal record for the same size and mtime is trusted instead of
+    reading the whole file again
+    """
+    if journal is not None:
+        known = journal.known_hash(entry.path, entry.size, entry.mtime_ns)
+        if known is not None:
+            return known
+    try:
+        return file_hash(entry.path)
+    except OSError:
+        return None
+
+def hash_needed(journal, manifest):
+    """
+    True if every document's content hash is recorded in this run
+    Otherwise a hash is only taken where it is used: see item_hash for
+    duplicates and digest_hash for the digest store
+    """
+    return journal is not None or manifest is not None
+
+def digest_hash(journal, entry, content_hash, summary_result):
+    """The content hash, computed now only if the result goes to the digest store"""
+    if content_hash is None and wants_digest(summary_result):
+        return document_hash(journal, entry)
+    return content_hash
+
+def item_hash(item):
+    """Content hash of a duplicate check item, computed on first use"""
+    if item["content_hash"] is None:
+        try:
+            item["content_hash"] = file_hash(item["file_path"])
+        except OSError:
+            pass
+    return item["content_hash"]
+
+def resumed_result(journal, entry):
+    """
+    Return (content hash, earlier result from the journal or None)
+    An earlier result only counts if the file content is unchanged
+    """
+    content_hash = document_hash(journal, entry)
+    return content_hash, journal.completed(entry.path, content_hash)
+
+def record_resumed(filename, result):
+    """Add a result carried over from the journal; its cost was paid in an earlier run"""
+    batch_stats["successful"] += 1
+    batch_stats["resumed"] += 1
+    store_result(result)
+
+def rebuild_from_journal(journal_path=JOURNAL_FILE, folder_path=None):
+    """Rebuild batch_stats from the journal (latest result per document)"""
+    reset_batch_stats()
+    for filename, result in journal_results(journal_path, folder_path):
+        batch_stats["total_docs"] += 1
+        record_result(filename, result)
+
+def start_result_stream(compress=False, path=None, append=False):
+    """
+    Stream results to batch_results_<timestamp>.jsonl[.gz] (or `path`) as
+    they complete instead of holding them in batch_stats["results"]
+    The resume journal, if any, is still loaded into memory in full
+    Returns the stream file path
+    """
+    global result_writer
+    if path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = f"batch_results_{timestamp}.jsonl"
+    result_writer = ResultStreamWriter(path, compress, append)
+    return result_writer.path
+
+def finish_result_stream():
+    """Close the result stream and write its statistics trailer"""
+    global result_writer
+    path = result_writer.path
+    result_writer.close(batch_statistics())
+    result_writer = None
+    return path
+
+def list_batch_files(folder_path, recursive=True, manifest=None):
+    """
+    Return the supported files to process (FileEntry list), or None if the
+    folder is missing or has nothing to do
+    With a manifest, only new or modified files are returned
+    """
     if not os.path.exists(folder_path):
         print(f"❌ Folder not found: {folder_path}")
-        return
-    
-    files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
+        return None
     
+    files = list(scan_folder(folder_path, recursive))
     if not files:
-        print(f"❌ No files found in {folder_path}")
-        return
+        print(f"❌ No supported documents found in {folder_path}")
+        return None
     
-    batch_stats["total_docs"] = len(files)
+    if manifest is not None:
+        scanned = len(files)
+        files = list(changed_files(files, manifest))
+        if scanned > len(files):
+            print(f"⏭️  Skipping {scanned - len(files)} unchanged document(s)")
+        if not files:
+            print(f"✅ No new or modified documents in {folder_path}")
+            return None
     
-    print(f"\n📚 Found {len(files)} document(s) to process")
+    return files
+
+def batch_source(folder_path, recursive=True, manifest=None, order="folder", priorities=()):
+    """
+    Files for a batch run, or None if there is nothing to do
+    In folder order this is a generator straight from the scan (with a
+    manifest, only new or modified files), so a huge folder is never listed
+    in memory; other orders and priorities need the full list to sort it
+    """
+    if order == "folder" and not priorities:
+        if not os.path.exists(folder_path):
+            print(f"❌ Folder not found: {folder_path}")
+            return None
+        entries = scan_folder(folder_path, recursive)
+        return changed_files(entries, manifest) if manifest is not None else entries
+    
+    files = list_batch_files(folder_path, recursive, manifest)
+    return order_entries(files, order, priorities) if files else None
+
+def announce_files(files, folder_path):
+    if isinstance(files, list):
+        print(f"\n📚 Found {len(files)} document(s) to process")
+    else:
+        print(f"\n📚 Processing documents from {folder_path} as they are found")
     print(f"⏰ Started at: {batch_stats['start_time'].strftime('%H:%M:%S')}\n")
+
+def progress_label(done, files):
+    return f"{done}/{len(files)}" if isinstance(files, list) else str(done)
+
+def report_nothing_done(folder_path, incremental):
+    """End of a streamed run that found no files"""
+    if incremental:
+        print(f"✅ No new or modified documents in {folder_path}")
+    else:
+        print(f"❌ No supported documents found in {folder_path}")
+
+def summarize_within_budget(text, filename, chunked=False, budget=None):
+    """
+    batch_summarize under a BudgetGuard: a document that doesn't fit gets a
+    failed result marked deferred=True and the model is not called
+    """
+    if budget is None:
+        return batch_summarize(text, filename, chunked)
     
-    # Process each document
-    for i, filename in enumerate(files, 1):
-        print(f"┌─ Processing {i}/{len(files)}: {filename}")
-        
-        file_path = os.path.join(folder_path, filename)
-        
-        # Read document
-        doc_result = read_document(file_path)
-        
-        if not doc_result['success']:
-            print(f"│  ❌ Failed to read: {doc_result['error']}")
-            batch_stats["failed"] += 1
-            batch_stats["results"].append({
-                "filename": filename,
-                "status": "failed",
-                "error": doc_result['error']
-            })
-            print("└─" + "─"*66)
-            continue
-        
-        print(f"│  📄 Read {doc_result['word_count']} words")
-        
-        # Summarize
-        print(f"│  🔄 Generating summary...")
-        summary_result = batch_summarize(doc_result['text'], filename)
-        
-        if summary_result['success']:
-            print(f"│  ✅ Summary generated")
-            print(f"│  💰 Cost: ${summary_result['cost']:.6f}")
-            batch_stats["successful"] += 1
-            batch_stats["total_cost"] += summary_result['cost']
-            batch_stats["results"].append(summary_result)
-        else:
-            print(f"│  ❌ Summary failed: {summary_result['error']}")
-            batch_stats["failed"] += 1
-            batch_stats["results"].append({
-                "filename": filename,
-                "status": "failed",
-                "error": summary_result['error']
-            })
-        
-        print("└─" + "─"*66 + "\n")
+    tokens, cost = estimate_summary(text, chunked)
+    if not budget.reserve(tokens, cost):
+        return dict(failure_result(filename, f"Over budget (est. ${cost:.6f})"), deferred=True)
+    summary_result = batch_summarize(text, filename, chunked)
+    budget.settle(tokens, cost, summary_result.get('tokens', 0), summary_result.get('cost', 0.0))
+    return summary_result
+
+def reuse_duplicate(item, original, match):
+    """
+    Result for a duplicate of an earlier (canonical) document: the same
+    summary at no cost, or None if the canonical has no summary to reuse
+    Items are dicts with filename, file_path, content_hash, truncated and result
+    Files are hashed here only for an exact match of truncated text
+    """
+    canonical, kind, similarity = match
+    if "result" not in original or not original["result"]['success']:
+        return None
+    if kind == "exact" and (item["truncated"] or original["truncated"]) and \
+            (item_hash(item) is None or item_hash(item) != item_hash(original)):
+        # Only the first MAX_DOCUMENT_CHARS were compared
+        kind = "prefix"
+    return dict(original["result"], filename=item["filename"], tokens=0, cost=0.0,
+                cached=False, duplicate_of=canonical, match=kind, similarity=round(similarity, 3))
+
+def save_failed(summary_result, action, error):
+    """The result of a document whose summary could not be saved, as a failure"""
+    print(f"⚠️  {summary_result['filename']}: failed to {action} ({error})")
+    return dict(summary_result, success=False, error=f"Failed to {action}: {error}")
+
+def finish_document(entry, content_hash, summary_result, journal, manifest):
+    """
+    Record a summarized document: journal, digest store, manifest and results
+    A disk or database error fails this document only; returns the result recorded
+    """
+    try:
+        if journal:
+            journal.append(entry.path, content_hash, summary_result, entry.size, entry.mtime_ns)
+        store_summary_digest(content_hash, entry.rel_path, summary_result)
+        if manifest is not None and summary_result['success']:
+            manifest.mark_processed(entry, content_hash)
+    except Exception as e:
+        summary_result = save_failed(summary_result, "record", e)
+    record_result(entry.rel_path, summary_result)
+    return summary_result
+
+def index_document(file_path, filename, content_hash, summary_result, terms=None):
+    """
+    Add a successfully summarized document to the search index
+    terms are the document's term counts (see doc_search.term_counts); without
+    them only the summary is searchable
+    Every FLUSH_DOCS documents this writes to disk, so keep it off the event loop
+    Returns the result, marked failed if indexing raised
+    """
+    if search_index is None or not summary_result['success']:
+        return summary_result
+    try:
+        search_index.add_document(file_path, summary=summary_result['summary'], content_hash=content_hash,
+                                  filename=filename, terms=terms if terms is not None else {})
+    except Exception as e:
+        return save_failed(summary_result, "index", e)
+    return summary_result
+
+def flush_index():
+    """Write the search index's buffered documents; a failure only leaves them unsearchable"""
+    if search_index is None:
+        return
+    try:
+        search_index.flush()
+    except Exception as e:
+        print(f"⚠️  Search index flush failed: {e}")
+
+def print_batch_summary():
+    """Display the end-of-batch statistics"""
     
     # Calculate duration
     end_time = datetime.now()
     duration = (end_time - batch_stats["start_time"]).total_seconds()
     
-    # Display summary
     print("\n" + "="*70)
     print("📊 BATCH PROCESSING COMPLETE")
     print("="*70)
@@ -143,36 +421,694 @@ def process_batch(folder_path):
     print(f"Successful: {batch_stats['successful']} ✅")
     print(f"Failed: {batch_stats['failed']} ❌")
     print(f"Total cost: ${batch_stats['total_cost']:.6f}")
+    print(f"Cache hits: {batch_stats['cache_hits']} (no cost)")
+    if batch_stats['resumed'] > 0:
+        print(f"Resumed from journal: {batch_stats['resumed']} (no cost)")
+    if batch_stats['deferred'] > 0:
+        print(f"Deferred (over budget): {batch_stats['deferred']} ⏸️")
     print(f"Duration: {int(duration//60)}m {int(duration%60)}s")
     if batch_stats['successful'] > 0:
         avg_cost = batch_stats['total_cost'] / batch_stats['successful']
         print(f"Average cost per doc: ${avg_cost:.6f}")
     print("="*70)
 
-def save_batch_results():
-    """Save all results to a JSON file"""
+def process_batch(folder_path, concurrency=1, chunked=False, journal_path=JOURNAL_FILE, resume=False,
+                  extract_workers=None, recursive=True, incremental=False, order="folder",
+                  priorities=(), budget=None, pack=False, dedup=False):
+    """
+    Process all documents in a folder
+    With concurrency > 1 (or pack=True), runs the staged pipeline (see
+    process_batch_async): extraction in worker processes overlaps with
+    `concurrency` summaries in flight; otherwise one document at a time
+    With chunked=True, long documents are read and summarized in full
+    Each finished document is appended to the journal at journal_path (None
+    disables it); resume=True skips documents it already holds unchanged
+    The folder is scanned recursively for supported files; incremental=True
+    only processes files that are new or modified since the last run
+    order/priorities set the processing order (see batch_budget.order_entries)
+    With a BudgetGuard, each document's cost is estimated before the model is
+    called and documents that would exceed the budget are deferred (not
+    journaled, so a later run picks them up)
+    With pack=True, short documents share requests (see doc_packing)
+    With dedup=True, exact and near-duplicate documents are summarized once
+    and the summary is reused for every copy
+    """
+    if concurrency > 1 or pack:
+        return asyncio.run(process_batch_async(
+            folder_path, concurrency, chunked, journal_path, resume, extract_workers,
+            recursive, incremental, order, priorities, budget, pack, dedup
+        ))
+    
+    print("\n" + "="*70)
+    print("🚀 BATCH PROCESSING STARTED")
+    print("="*70)
+    
+    batch_stats["start_time"] = datetime.now()
+    
+    manifest = FileManifest(MANIFEST_FILE) if incremental else None
+    files = batch_source(folder_path, recursive, manifest, order, priorities)
+    if files is None:
+        return
+    announce_files(files, folder_path)
+    
+    max_chars = None if chunked else MAX_DOCUMENT_CHARS
+    journal = BatchJournal(journal_path) if journal_path else None
+    duplicates = DuplicateIndex() if dedup else None
+    # Canonical document of each duplicate group -> its finished item
+    canonical_items = {}
+    # Files are only hashed when something uses the hash
+    hashing = hash_needed(journal, manifest)
+    resume = resume and journal is not None
+    
+    # Process each document
+    for i, entry in enumerate(files, 1):
+        filename = entry.rel_path
+        print(f"┌─ Processing {progress_label(i, files)}: {filename}")
+        batch_stats["total_docs"] += 1
+        
+        content_hash, previous = resumed_result(journal, entry) if resume else (None, None)
+        if previous:
+            print(f"│  ⏭️  Already processed (from journal)")
+            record_resumed(filename, previous)
+            if manifest is not None:
+                manifest.mark_processed(entry, content_hash)
+            print("└─" + "─"*66 + "\n")
+            continue
+        
+        if budget is not None and budget.stopped:
+            print(f"│  ⏸️  Deferred, over budget")
+            batch_stats["deferred"] += 1
+            print("└─" + "─"*66 + "\n")
+            continue
+        
+        # Read document
+        doc_result = read_document(entry.path, max_chars=max_chars)
+        if hashing and content_hash is None:
+            content_hash = document_hash(journal, entry)
+        
+        terms = None
+        if not doc_result['success']:
+            print(f"│  ❌ Failed to read: {doc_result['error']}")
+            summary_result = failure_result(filename, f"Failed to read: {doc_result['error']}")
+        else:
+            print(f"│  📄 Read {doc_result['word_count']} words")
+            text = doc_result['text']
+            if search_index is not None:
+                terms = term_counts(text)
+            
+            summary_result = None
+            item = {"filename": filename, "file_path": entry.path, "content_hash": content_hash,
+                    "truncated": doc_result.get('truncated', False)}
+            if duplicates is not None:
+                match = duplicates.add(filename, fingerprint(text))
+                if match is None:
+                    canonical_items[filename] = item
+                else:
+                    summary_result = reuse_duplicate(item, canonical_items[match[0]], match)
+            
+            if summary_result is not None:
+                print(f"│  🔁 {summary_result['match'].capitalize()} duplicate of "
+                      f"{summary_result['duplicate_of']}, summary reused")
+            else:
+                # Summarize
+                print(f"│  🔄 Generating summary...")
+                summary_result = summarize_within_budget(text, filename, chunked, budget)
+                item["result"] = summary_result
+                if summary_result.get('deferred'):
+                    print(f"│  ⏸️  Deferred, {summary_result['error'].lower()}")
+                    batch_stats["deferred"] += 1
+                    print("└─" + "─"*66 + "\n")
+                    continue
+                if summary_result['success']:
+                    print(f"│  ✅ Summary generated" + (" (cached)" if summary_result['cached'] else ""))
+                    if summary_result.get('chunks'):
+                        print(f"│  🧩 {summary_result['chunks']} chunks ({summary_result['chunks_reused']} reused), "
+                              f"{summary_result['llm_calls']} requests")
+                    print(f"│  💰 Cost: ${summary_result['cost']:.6f}")
+                else:
+                    print(f"│  ❌ Summary failed: {summary_result['error']}")
+            content_hash = digest_hash(journal, entry, item["content_hash"], summary_result)
+        
+        summary_result = index_document(entry.path, filename, content_hash, summary_result, terms)
+        finish_document(entry, content_hash, summary_result, journal, manifest)
+        print("└─" + "─"*66 + "\n")
+    
+    if manifest is not None:
+        manifest.close()
+    flush_index()
+    
+    if batch_stats["total_docs"] == 0:
+        report_nothing_done(folder_path, incremental)
+        return
+    
+    print_batch_summary()
+    if budget is not None:
+        print(f"Budget used: {budget.describe()}")
+    if duplicates is not None:
+        batch_stats["duplicate_groups"] = duplicates.groups
+        print(f"Duplicates collapsed: {duplicates.duplicate_count()} in {len(duplicates.groups)} group(s)")
+
+async def process_batch_async(folder_path, concurrency=DEFAULT_CONCURRENCY, chunked=False,
+                              journal_path=JOURNAL_FILE, resume=False, extract_workers=None,
+                              recursive=True, incremental=False, order="folder", priorities=(),
+                              budget=None, pack=False, dedup=False):
+    """
+    Process all documents in a folder with a staged pipeline:
+    folder scan -> process-pool extraction -> async summarization -> results
+    Bounded queues between the stages keep memory flat on huge folders
+    (in folder order the scan itself is streamed too, see batch_source)
+    Journal, resume, recursive, incremental, ordering, budget, packing and
+    dedup work as in process_batch
+    """
+    extract_workers = extract_workers or DEFAULT_EXTRACT_WORKERS
+    
+    print("\n" + "="*70)
+    print(f"🚀 BATCH PROCESSING STARTED ({extract_workers} extractors, {concurrency} summaries at a time)")
+    print("="*70)
+    
+    batch_stats["start_time"] = datetime.now()
+    
+    manifest = FileManifest(MANIFEST_FILE) if incremental else None
+    files = batch_source(folder_path, recursive, manifest, order, priorities)
+    if files is None:
+        return
+    announce_files(files, folder_path)
+    
+    max_chars = None if chunked else MAX_DOCUMENT_CHARS
+    journal = BatchJournal(journal_path) if journal_path else None
+    loop = asyncio.get_running_loop()
+    scanned = 0
+    completed = 0
+    # Scan position of each finished document, to report results in folder order
+    positions = {}
+    
+    # At most `concurrency` requests in flight; with packing, more documents
+    # than that are summarized at once so packs can fill up
+    request_slots = asyncio.Semaphore(concurrency)
+    summarize_workers = concurrency * PACK_MAX_DOCS if pack else concurrency
+    
+    async def summarize_alone(text, filename):
+        async with request_slots:
+            return await batch_summarize_async(text, filename, chunked)
+    
+    async def send_pack(request):
+        async with request_slots:
+            return await acreate_chat_completion(async_client, **request)
+    
+    packer = DocumentPacker(send_pack, summarize_alone) if pack else None
+    duplicates = DuplicateIndex() if dedup else None
+    # Canonical document of each duplicate group -> future of its finished item
+    canonical_items = {}
+    # Files are only hashed when something uses the hash
+    hashing = hash_needed(journal, manifest)
+    resume = resume and journal is not None
+    
+    async def summarize_document(text, filename):
+        if packer is not None and estimate_tokens(text) <= SMALL_DOC_TOKENS:
+            return await packer.submit(text, filename)
+        return await summarize_alone(text, filename)
+    
+    with worker_pool(extract_workers) as pool:
+        
+        async def extract(entry):
+            nonlocal scanned
+            item = {"filename": entry.rel_path, "file_path": entry.path, "entry": entry, "position": scanned}
+            scanned += 1
+            item["content_hash"] = None
+            if resume:
+                item["content_hash"], previous = await asyncio.to_thread(resumed_result, journal, entry)
+                if previous:
+                    item["resumed"] = previous
+                    return item
+            if budget is not None and budget.stopped:
+                # The budget ran out: don't bother extracting the rest
+                item["deferred"] = None
+                return item
+            
+            try:
+                item["doc"] = await loop.run_in_executor(pool, extract_in_worker, item["file_path"], max_chars)
+            except Exception as e:
+                item["doc"] = {"success": False, "error": str(e)}
+            return item
+        
+        async def summarize_text(item, text):
+            if budget is None:
+                item["result"] = await summarize_document(text, item["filename"])
+                return
+            
+            tokens, cost = await asyncio.to_thread(estimate_summary, text, chunked)
+            if not budget.reserve(tokens, cost):
+                item["deferred"] = cost
+                return
+            item["result"] = await summarize_document(text, item["filename"])
+            budget.settle(tokens, cost, item["result"].get('tokens', 0), item["result"].get('cost', 0.0))
+        
+        async def summarize_checked(item, text):
+            try:
+                await summarize_text(item, text)
+            except Exception as e:
+                item["result"] = failure_result(item["filename"], str(e))
+        
+        async def summarize_once(item, text):
+            """Summarize a document unless it duplicates one already seen"""
+            match = duplicates.add(item["filename"], await asyncio.to_thread(fingerprint, text))
+            if match is None:
+                canonical_items[item["filename"]] = loop.create_future()
+                try:
+                    await summarize_checked(item, text)
+                finally:
+                    canonical_items[item["filename"]].set_result(item)
+                return
+            
+            original = await asyncio.shield(canonical_items[match[0]])
+            result = await asyncio.to_thread(reuse_duplicate, item, original, match)
+            if result is None:
+                # Nothing worth reusing: summarize this copy on its own
+                await summarize_checked(item, text)
+            else:
+                # Same summary, paid for once
+                item["result"] = result
+        
+        async def summarize(item):
+            if "resumed" in item or "deferred" in item:
+                return item
+            
+            if hashing and item["content_hash"] is None:
+                item["content_hash"] = await asyncio.to_thread(document_hash, journal, item["entry"])
+            
+            # Drop the document text as soon as it has been summarized
+            doc_result = item.pop("doc")
+            if not doc_result['success']:
+                item["result"] = failure_result(item["filename"], f"Failed to read: {doc_result['error']}")
+            else:
+                item["word_count"] = doc_result['word_count']
+                item["truncated"] = doc_result.get('truncated', False)
+                if search_index is not None:
+                    item["terms"] = await asyncio.to_thread(term_counts, doc_result['text'])
+                if duplicates is None:
+                    await summarize_text(item, doc_result['text'])
+                else:
+                    await summarize_once(item, doc_result['text'])
+                if "result" in item:
+                    item["content_hash"] = await asyncio.to_thread(
+                        digest_hash, journal, item["entry"], item["content_hash"], item["result"])
+                if search_index is not None and "result" in item:
+                    item["result"] = await asyncio.to_thread(index_document, item["file_path"], item["filename"],
+                                                             item["content_hash"], item["result"], item.pop("terms"))
+            return item
+        
+        def write(item):
+            nonlocal completed
+            completed += 1
+            batch_stats["total_docs"] += 1
+            filename = item["filename"]
+            progress = progress_label(completed, files)
+            if result_writer is None:
+                positions[filename] = item["position"]
+            
+            if "resumed" in item:
+                print(f"⏭️  {progress} {filename} (from journal)")
+                record_resumed(filename, item["resumed"])
+                if manifest is not None:
+                    try:
+                        manifest.mark_processed(item["entry"], item["content_hash"])
+                    except Exception as e:
+                        print(f"⚠️  {filename}: failed to update the manifest ({e})")
+                return
+            
+            if "deferred" in item:
+                estimate = f" (est. ${item['deferred']:.6f})" if item["deferred"] is not None else ""
+                print(f"⏸️  {progress} {filename}: deferred, over budget{estimate}")
+                batch_stats["deferred"] += 1
+                return
+            
+            summary_result = item["result"]
+            if summary_result.get('duplicate_of'):
+                print(f"🔁 {progress} {filename}: {summary_result['match']} duplicate of "
+                      f"{summary_result['duplicate_of']}, summary reused")
+            elif summary_result['success']:
+                cached = ", cached" if summary_result['cached'] else ""
+                chunks = f", {summary_result['chunks']} chunks" if summary_result.get('chunks') else ""
+                packed = f", packed x{summary_result['packed']}" if summary_result.get('packed') else ""
+                print(f"✅ {progress} {filename} "
+                      f"({item['word_count']} words{chunks}{packed}, ${summary_result['cost']:.6f}{cached})")
+            else:
+                print(f"❌ {progress} {filename}: {summary_result['error']}")
+            
+            finish_document(item["entry"], item["content_hash"], summary_result, journal, manifest)
+        
+        stage_stats = await run_pipeline(
+            files, extract, summarize, write,
+            extract_workers=extract_workers,
+            summarize_workers=summarize_workers,
+            queue_size=PIPELINE_QUEUE_SIZE
+        )
+    
+    if manifest is not None:
+        manifest.close()
+    await asyncio.to_thread(flush_index)
+    
+    if batch_stats["total_docs"] == 0:
+        report_nothing_done(folder_path, incremental)
+        return
+    
+    if result_writer is None:
+        # Results arrive in completion order; reports list them in folder order
+        batch_stats["results"].sort(key=lambda result: positions.get(result['filename'], len(positions)))
+    
+    print_batch_summary()
+    if budget is not None:
+        print(f"Budget used: {budget.describe()}")
+    if duplicates is not None:
+        batch_stats["duplicate_groups"] = duplicates.groups
+        print(f"Duplicates collapsed: {duplicates.duplicate_count()} in {len(duplicates.groups)} group(s)")
+    if packer is not None:
+        print(f"Packed requests: {packer.packs} ({packer.fallbacks} fell back to one request per document)")
+    print("Pipeline stages:")
+    for stats in stage_stats:
+        print(f"   {stats.describe()}")
+
+def summarize_file(file_path, filename, chunked=False, budget=None):
+    """
+    Read and summarize one file in this process
+    Returns (content hash, summary result, term counts for the search index or None)
+    With a BudgetGuard, see summarize_within_budget
+    """
+    content_hash = file_hash(file_path)
+    doc_result = read_document(file_path, verbose=False,
+                               max_chars=None if chunked else MAX_DOCUMENT_CHARS)
+    if not doc_result['success']:
+        return content_hash, failure_result(filename, f"Failed to read: {doc_result['error']}"), None
+    terms = term_counts(doc_result['text']) if search_index is not None else None
+    return content_hash, summarize_within_budget(doc_result['text'], filename, chunked, budget), terms
+
+def process_watched_file(entry, chunked, journal, manifest, budget=None):
+    """Extract, summarize and record one new or modified file (watch mode)"""
+    content_hash, summary_result, terms = summarize_file(entry.path, entry.rel_path, chunked, budget)
+    
+    batch_stats["total_docs"] += 1
+    if summary_result.get('deferred'):
+        # Not journaled or marked processed, so the next run picks it up
+        batch_stats["deferred"] += 1
+        print(f"⏸️  {entry.rel_path}: deferred, {summary_result['error'].lower()}")
+        return
+    summary_result = index_document(entry.path, entry.rel_path, content_hash, summary_result, terms)
+    summary_result = finish_document(entry, content_hash, summary_result, journal, manifest)
+    if summary_result['success']:
+        cached = ", cached" if summary_result['cached'] else ""
+        print(f"✅ {entry.rel_path} (${summary_result['cost']:.6f}{cached})")
+    else:
+        print(f"❌ {entry.rel_path}: {summary_result['error']}")
+
+def watch_folder(folder_path, chunked=False, journal_path=JOURNAL_FILE, recursive=True,
+                 poll_interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS, budget=None):
+    """
+    Keep summarizing a folder as files are added or changed (runs until Ctrl+C)
+    First catches up on anything new since the last run (per the manifest),
+    then waits for inotify events (or polls) and processes each changed file
+    once it has been quiet for `debounce` seconds
+    Results go to the active result stream as soon as each file is done
+    With a BudgetGuard, files that would exceed it are deferred to a later run
+    """
+    if not os.path.exists(folder_path):
+        print(f"❌ Folder not found: {folder_path}")
+        return
+    
+    batch_stats["start_time"] = datetime.now()
+    manifest = FileManifest(MANIFEST_FILE)
+    journal = BatchJournal(journal_path) if journal_path else None
+    # Start watching before the catch-up pass so nothing slips in between
+    watcher = make_watcher(folder_path, recursive, poll_interval)
+    
+    try:
+        backlog = list(changed_files(scan_folder(folder_path, recursive), manifest))
+        if backlog:
+            print(f"📚 Catching up on {len(backlog)} new or modified document(s)")
+        for entry in backlog:
+            process_watched_file(entry, chunked, journal, manifest, budget)
+        
+        flush_index()
+        
+        print(f"\n👀 Watching {folder_path} ({watcher.kind}), press Ctrl+C to stop")
+        for paths in watch_changes(watcher, debounce):
+            entries = (file_entry(path, folder_path) for path in paths)
+            for entry in changed_files((entry for entry in entries if entry), manifest):
+                process_watched_file(entry, chunked, journal, manifest, budget)
+            # Make each round of changes searchable from other processes straight away
+            flush_index()
+    finally:
+        watcher.close()
+        manifest.close()
+
+def process_queue(queue, folder_path, concurrency=1, chunked=False, worker_id=None,
+                  lease_seconds=LEASE_SECONDS):
+    """
+    Work through a shared WorkQueue as one of any number of workers
+    (other processes or hosts running the same command)
+    `concurrency` threads each claim a document, summarize it and complete
+    it; a LeaseKeeper heartbeats the leases meanwhile. Failed documents go
+    back to the queue for another attempt. Returns once nothing is left
+    """
+    worker_id = worker_id or default_worker_id()
+    keeper = LeaseKeeper(queue, worker_id, lease_seconds)
+    print(f"\n🧑‍🏭 Worker {worker_id} started ({concurrency} at a time)")
+    
+    def work():
+        done = 0
+        while True:
+            claimed = queue.claim(worker_id, lease_seconds)
+            if claimed is None:
+                # Leases held by other workers may still expire and come back to us
+                if queue.counts().get('leased', 0) <= len(keeper.held):
+                    return done
+                time.sleep(min(5.0, lease_seconds / 4))
+                continue
+            
+            task_id, rel_path = claimed
+            keeper.hold(task_id)
+            file_path = os.path.join(folder_path, rel_path)
+            try:
+                content_hash, summary_result, terms = summarize_file(file_path, rel_path, chunked)
+            except Exception as e:
+                content_hash, summary_result, terms = None, failure_result(rel_path, str(e)), None
+            finally:
+                keeper.drop(task_id)
+            
+            if not summary_result['success']:
+                print(f"❌ {rel_path}: {summary_result['error']}")
+                queue.release(worker_id, task_id, summary_result['error'])
+            elif queue.complete(worker_id, task_id, summary_result, content_hash):
+                done += 1
+                store_summary_digest(content_hash, rel_path, summary_result)
+                index_document(file_path, rel_path, content_hash, summary_result, terms)
+                print(f"✅ {rel_path} (${summary_result['cost']:.6f})")
+            else:
+                print(f"⚠️  {rel_path}: lease lost, result discarded (another worker owns it)")
+    
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            done = sum(executor.map(lambda _: work(), range(concurrency)))
+    finally:
+        keeper.stop()
+        flush_index()
+    print(f"🧑‍🏭 Worker {worker_id} finished: {done} document(s) completed")
+
+def rebuild_from_queue(queue):
+    """Rebuild batch_stats from every worker's results in the queue"""
+    reset_batch_stats()
+    for rel_path, result in queue.results():
+        batch_stats["total_docs"] += 1
+        record_result(rel_path, result)
+
+def print_worker_stats(queue):
+    """Per-worker share of the merged run"""
+    print("Workers:")
+    for stats in queue.worker_stats():
+        print(f"   {stats['worker']}: {stats['successful']} ✅ {stats['failed']} ❌ "
+              f"${stats['cost']:.6f} ({stats['cache_hits']} cached)")
+
+def run_queue_worker(queue_path, folder_path, concurrency=1, chunked=False, recursive=True,
+                     worker_id=None):
+    """
+    Queue the folder's new or changed documents (idempotent, so every
+    worker can do it), work through the queue, then rebuild batch_stats
+    from all workers' results
+    """
+    if not os.path.exists(folder_path):
+        print(f"❌ Folder not found: {folder_path}")
+        return
+    
+    batch_stats["start_time"] = datetime.now()
+    queue = SQLiteWorkQueue(queue_path)
+    try:
+        queued = queue.enqueue(scan_folder(folder_path, recursive))
+        print(f"\n📥 Queued {queued} new or changed document(s) in {queue_path}")
+        process_queue(queue, folder_path, concurrency, chunked, worker_id)
+        
+        rebuild_from_queue(queue)
+        print_batch_summary()
+        print_worker_stats(queue)
+        left = queue.counts().get('pending', 0) + queue.counts().get('leased', 0)
+        if left:
+            print(f"⏳ {left} document(s) still pending in the queue")
+    finally:
+        queue.close()
+
+def write_batch_job(folder_path, recursive=True, extract_workers=None):
+    """
+    Extract every document and write its summary request to a JSONL job
+    file (batch_job_<timestamp>.jsonl) for a provider batch run
+    Returns the job state: job file, documents by request id, read failures
+    Long documents are truncated as in a normal run (no map-reduce)
+    """
+    files = list_batch_files(folder_path, recursive)
+    if not files:
+        return None
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    state = {
+        "job_file": f"batch_job_{timestamp}.jsonl",
+        "folder": folder_path,
+        "documents": {},
+        "failures": []
+    }
+    
+    print(f"\n📚 Extracting {len(files)} document(s) for the batch job")
+    paths = [entry.path for entry in files]
+    with worker_pool(extract_workers or DEFAULT_EXTRACT_WORKERS) as pool, \
+         open(state["job_file"], 'w', encoding='utf-8') as f:
+        doc_results = pool.map(extract_in_worker, paths, [MAX_DOCUMENT_CHARS] * len(paths), chunksize=8)
+        for i, (entry, doc_result) in enumerate(zip(files, doc_results), 1):
+            if not doc_result['success']:
+                state["failures"].append([entry.rel_path, f"Failed to read: {doc_result['error']}"])
+                continue
+            custom_id = f"doc-{i}"
+            f.write(json.dumps(job_line(custom_id, build_summary_request(doc_result['text'])),
+                               ensure_ascii=False) + "\n")
+            state["documents"][custom_id] = {
+                "filename": entry.rel_path,
+                "file_path": entry.path,
+                "content_hash": file_hash(entry.path)
+            }
+    
+    print(f"📝 Job file: {state['job_file']} ({len(state['documents'])} request(s))")
+    return state
+
+def submit_batch_job(folder_path, backend, recursive=True, extract_workers=None):
+    """Write and submit a batch job; returns the path of its state file (for ingest_batch_job)"""
+    state = write_batch_job(folder_path, recursive, extract_workers)
+    if state is None:
+        return None
+    
+    state["backend"] = backend.name
+    state["job_id"] = backend.submit(state["job_file"]) if state["documents"] else None
+    state["submitted_at"] = datetime.now().isoformat()
+    state_path = state["job_file"] + ".state.json"
+    save_job_state(state_path, state)
+    print(f"📤 Submitted job {state['job_id']} ({backend.name}); state saved to {state_path}")
+    return state_path
+
+def ingest_batch_job(state_path, backend, journal_path=JOURNAL_FILE, poll_seconds=JOB_POLL_SECONDS):
+    """
+    Wait for a submitted batch job and load its results into batch_stats
+    (and the journal), so the usual reports can be written
+    Batch pricing is applied to the cost of every result
+    """
+    state = load_job_state(state_path)
+    job_id = state["job_id"]
+    reset_batch_stats()
+    batch_stats["start_time"] = datetime.fromisoformat(state["submitted_at"])
+    journal = BatchJournal(journal_path) if journal_path else None
+    
+    outputs = {}
+    if job_id is not None:
+        status = wait_for_job(backend, job_id, poll_seconds)
+        if status != "completed":
+            print(f"❌ Batch job {job_id} {status}")
+            return
+        outputs = {line["custom_id"]: line for line in backend.results(job_id)}
+    
+    for custom_id, doc in state["documents"].items():
+        line = outputs.get(custom_id)
+        response = (line or {}).get("response") or {}
+        if response.get("status_code") == 200:
+            summary_result = summary_result_from_response(response_from_body(response["body"]), doc["filename"])
+            summary_result["cost"] *= BATCH_COST_FACTOR
+        elif line is None:
+            summary_result = failure_result(doc["filename"], "No result in the batch job output")
+        else:
+            error = line.get("error") or response.get("body", {}).get("error") or f"HTTP {response.get('status_code')}"
+            summary_result = failure_result(doc["filename"], str(error))
+        
+        batch_stats["total_docs"] += 1
+        record_result(doc["filename"], summary_result)
+        if journal:
+            journal.append(doc["file_path"], doc["content_hash"], summary_result)
+        store_summary_digest(doc["content_hash"], doc["filename"], summary_result)
+        # The batch job kept no document text, so only the summary is indexed
+        index_document(doc["file_path"], doc["filename"], doc["content_hash"], summary_result)
+    
+    flush_index()
+    
+    for filename, error in state["failures"]:
+        batch_stats["total_docs"] += 1
+        record_result(filename, failure_result(filename, error))
+    
+    batch_stats["results"].sort(key=lambda result: result['filename'])
+    print_batch_summary()
+
+def batch_statistics():
+    """Aggregate statistics as saved in the JSON output"""
+    return {
+        "total_documents": batch_stats["total_docs"],
+        "successful": batch_stats["successful"],
+        "failed": batch_stats["failed"],
+        "total_cost": f"${batch_stats['total_cost']:.6f}",
+        "cache_hits": batch_stats["cache_hits"],
+        "resumed": batch_stats["resumed"],
+        "deferred": batch_stats["deferred"]
+    }
+
+def save_batch_results(journal_path=None, folder_path=None):
+    """
+    Save all results to a JSON file
+    With journal_path, the results are rebuilt from the journal first
+    """
+    if journal_path:
+        rebuild_from_journal(journal_path, folder_path)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"batch_results_{timestamp}.json"
     
     output_data = {
         "timestamp": datetime.now().isoformat(),
-        "statistics": {
-            "total_documents": batch_stats["total_docs"],
-            "successful": batch_stats["successful"],
-            "failed": batch_stats["failed"],
-            "total_cost": f"${batch_stats['total_cost']:.6f}"
-        },
+        "statistics": batch_statistics(),
         "results": batch_stats["results"]
     }
+    if batch_stats["duplicate_groups"]:
+        output_data["duplicate_groups"] = batch_stats["duplicate_groups"]
     
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(output_data, f, indent=2, ensure_ascii=False)
     
     return output_file
 
-def create_summary_report():
-    """Create a readable text report of all summaries"""
+def create_summary_report(journal_path=None, folder_path=None, results_file=None):
+    """
+    Create a readable text report of all summaries
+    With journal_path, the results are rebuilt from the journal first
+    With results_file, the report streams over a result stream file instead
+    of batch_stats, so the results are never all in memory at once
+    """
+    if journal_path:
+        rebuild_from_journal(journal_path, folder_path)
+    
+    if results_file:
+        statistics = read_stats(results_file) or batch_statistics()
+        results = iter_results(results_file)
+    else:
+        statistics = batch_statistics()
+        results = batch_stats["results"]
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"batch_report_{timestamp}.txt"
@@ -183,18 +1119,24 @@ def create_summary_report():
         f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write("="*70 + "\n\n")
         
-        f.write(f"Total Documents: {batch_stats['total_docs']}\n")
-        f.write(f"Successfully Processed: {batch_stats['successful']}\n")
-        f.write(f"Failed: {batch_stats['failed']}\n")
-        f.write(f"Total Cost: ${batch_stats['total_cost']:.6f}\n\n")
+        f.write(f"Total Documents: {statistics['total_documents']}\n")
+        f.write(f"Successfully Processed: {statistics['successful']}\n")
+        f.write(f"Failed: {statistics['failed']}\n")
+        f.write(f"Total Cost: {statistics['total_cost']}\n")
+        f.write(f"Cache Hits: {statistics['cache_hits']}\n")
+        if statistics.get('deferred'):
+            f.write(f"Deferred (over budget): {statistics['deferred']}\n")
+        f.write("\n")
         
         f.write("="*70 + "\n\n")
         
         # Write each summary
-        for i, result in enumerate(batch_stats["results"], 1):
+        for i, result in enumerate(results, 1):
             if result.get('success'):
                 f.write(f"DOCUMENT {i}: {result['filename']}\n")
                 f.write("-"*70 + "\n")
+                if result.get('duplicate_of'):
+                    f.write(f"(Duplicate of {result['duplicate_of']}, {result['match']} match)\n")
                 f.write(result['summary'])
                 f.write("\n")
                 f.write(f"Tokens: {result['tokens']} | Cost: ${result['cost']:.6f}\n")
@@ -207,8 +1149,90 @@ def create_summary_report():
     
     return output_file
 
+def save_streamed_results():
+    """Close the result stream and render the text report from it"""
+    results_file = finish_result_stream()
+    print(f"\n✅ JSONL results saved: {results_file}")
+    
+    report_file = create_summary_report(results_file=results_file)
+    print(f"✅ Text report saved: {report_file}")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Batch document processor")
+    parser.add_argument("folder", nargs="?",
+                        help="Folder to process (prompted for if omitted)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help=f"Documents to summarize at once (e.g. {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--extract-workers", type=int, default=DEFAULT_EXTRACT_WORKERS,
+                        help="Processes extracting documents ahead of summarization")
+    parser.add_argument("--no-recursive", action="store_true",
+                        help="Only process files directly in the folder, not in subfolders")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process files that are new or modified since the last run")
+    parser.add_argument("--watch", action="store_true",
+                        help=f"Keep running and summarize files as they are added or changed "
+                             f"(results appended to {WATCH_RESULTS_FILE})")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                        help="Seconds between folder rescans in --watch when inotify is unavailable")
+    parser.add_argument("--queue",
+                        help="Shared work queue file: any number of workers (hosts) split the folder")
+    parser.add_argument("--worker-id",
+                        help="Name for this worker in --queue mode (default: host:pid)")
+    parser.add_argument("--order", choices=ORDER_POLICIES, default="folder",
+                        help="Processing order: folder, shortest first (fast feedback) or largest first")
+    parser.add_argument("--priority", action="append", default=[], metavar="PATTERN",
+                        help="Process files matching this glob (e.g. 'urgent/*') first; repeatable")
+    parser.add_argument("--max-cost", type=float,
+                        help="Dollar budget for the run; documents that would exceed it are deferred")
+    parser.add_argument("--max-tokens", type=int,
+                        help="Token budget for the run")
+    parser.add_argument("--on-budget", choices=BUDGET_ACTIONS, default="defer",
+                        help="defer: skip documents that don't fit and try the rest; stop: defer everything left")
+    parser.add_argument("--pack", action="store_true",
+                        help="Summarize short documents several per request (fewer, cheaper requests)")
+    parser.add_argument("--batch-job", action="store_true",
+                        help="Submit all requests as one provider batch job (cheaper, results within 24h)")
+    parser.add_argument("--batch-backend", choices=["openai", "local"], default="openai",
+                        help="Where --batch-job runs (local: offline file-based stand-in)")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="With --batch-job, only submit; collect later with --ingest-job")
+    parser.add_argument("--ingest-job", metavar="STATE_FILE",
+                        help="Wait for a submitted batch job and write its reports")
+    parser.add_argument("--job-poll", type=int, default=JOB_POLL_SECONDS,
+                        help="Seconds between batch job status checks")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Summarize duplicate and near-duplicate documents once and reuse the summary")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Summarize long documents in full (map-reduce) instead of truncating")
+    parser.add_argument("--journal", default=JOURNAL_FILE,
+                        help=f"Per-document journal file (default: {JOURNAL_FILE})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip documents the journal already holds with unchanged content")
+    parser.add_argument("--report-from-journal", action="store_true",
+                        help="Only rebuild the JSON/text reports for the folder from the journal")
+    parser.add_argument("--stream-results", action="store_true",
+                        help="Write each result to a JSONL file as it completes instead of keeping it in memory")
+    parser.add_argument("--gzip", action="store_true",
+                        help="Compress the streamed results file (with --stream-results)")
+    args = parser.parse_args()
+    
+    # Queue workers and provider batch jobs have no shared view of what is spent
+    if args.max_cost is not None or args.max_tokens is not None:
+        for flag, used in (("--queue", args.queue), ("--batch-job", args.batch_job),
+                           ("--ingest-job", args.ingest_job)):
+            if used:
+                parser.error(f"--max-cost/--max-tokens can't be used with {flag}")
+    return args
+
 def main():
     """Main function"""
+    args = parse_args()
+    
+    budget = None
+    if args.max_cost is not None or args.max_tokens is not None:
+        budget = BudgetGuard(args.max_cost, args.max_tokens, args.on_budget)
+    
     print("\n" + "="*70)
     print("          📦 BATCH DOCUMENT PROCESSOR 📦")
     print("          Process Multiple Documents Automatically")
@@ -217,10 +1241,12 @@ def main():
     # Get folder path
     default_folder = "test_documents"
     
-    print(f"\n📁 Enter folder path to process")
-    print(f"   (Press Enter to use: {default_folder})")
-    
-    folder = input("\nFolder path: ").strip()
+    folder = args.folder
+    if folder is None:
+        print(f"\n📁 Enter folder path to process")
+        print(f"   (Press Enter to use: {default_folder})")
+        
+        folder = input("\nFolder path: ").strip()
     
     if not folder:
         folder = default_folder
@@ -228,8 +1254,47 @@ def main():
         if not os.path.exists(folder):
             folder = "../day3-document-summarizer/test_documents"
     
-    # Process batch
-    process_batch(folder)
+    if args.watch:
+        results_file = start_result_stream(path=WATCH_RESULTS_FILE, append=True)
+        print(f"\n📝 Appending results to: {results_file}")
+        watch_folder(folder, chunked=args.chunked, journal_path=args.journal,
+                     recursive=not args.no_recursive, poll_interval=args.poll_interval, budget=budget)
+        save_streamed_results()
+        return
+    
+    if args.stream_results and not args.report_from_journal:
+        results_file = start_result_stream(compress=args.gzip)
+        print(f"\n📝 Streaming results to: {results_file}")
+    
+    if args.report_from_journal:
+        rebuild_from_journal(args.journal, folder)
+        print(f"\n📒 Rebuilt {batch_stats['total_docs']} result(s) from {args.journal}")
+    elif args.batch_job or args.ingest_job:
+        if args.ingest_job:
+            state_path = args.ingest_job
+            backend = make_backend(load_job_state(state_path)["backend"], client)
+        else:
+            backend = make_backend(args.batch_backend, client)
+            state_path = submit_batch_job(folder, backend, recursive=not args.no_recursive,
+                                          extract_workers=args.extract_workers)
+        if state_path is None or args.no_wait:
+            return
+        ingest_batch_job(state_path, backend, journal_path=args.journal, poll_seconds=args.job_poll)
+    elif args.queue:
+        run_queue_worker(args.queue, folder, concurrency=args.concurrency, chunked=args.chunked,
+                         recursive=not args.no_recursive, worker_id=args.worker_id)
+    else:
+        # Process batch
+        process_batch(folder, concurrency=args.concurrency, chunked=args.chunked,
+                      journal_path=args.journal, resume=args.resume,
+                      extract_workers=args.extract_workers,
+                      recursive=not args.no_recursive, incremental=args.incremental,
+                      order=args.order, priorities=args.priority, budget=budget,
+                      pack=args.pack, dedup=args.dedup)
+    
+    if result_writer is not None:
+        save_streamed_results()
+        return
     
     # Save results
     if batch_stats["successful"] > 0 or batch_stats["failed"] > 0:
@@ -250,7 +1315,10 @@ if __name__ == "__main__":
         main()
     except KeyboardInterrupt:
         print("\n\n⚠️  Batch processing interrupted")
-        if batch_stats["successful"] > 0 or batch_stats["failed"] > 0:
+        if result_writer is not None:
+            print("Saving partial results...")
+            save_streamed_results()
+        elif batch_stats["successful"] > 0 or batch_stats["failed"] > 0:
             print("Saving partial results...")
             save_batch_results()
             create_summary_report()
\ No newline at end of file
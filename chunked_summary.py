@@ -0,0 +1,285 @@
+import os
+import re
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from llm_client import (create_chat_completion, lookup_cache, estimate_tokens, estimate_request_tokens,
+                        response_cost, is_cached, CHARS_PER_TOKEN)
+
+# Size of each chunk sent in the map step
+CHUNK_TOKENS = 3000
+# Largest input for one reduce request; bigger sets of summaries are reduced in rounds
+REDUCE_INPUT_TOKENS = 4000
+# Chunk requests in flight at once (the shared scheduler still applies its limits)
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "8"))
+
+# Gear table for the rolling hash (fixed seed so boundaries are stable across runs)
+_gear_random = random.Random(0x5EED)
+GEAR = [_gear_random.getrandbits(32) for _ in range(256)]
+# How far past a hash boundary we look for a newline/space to cut on
+BOUNDARY_SEARCH_CHARS = 200
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """
+    Split text into chunks of at most max_tokens
+    Breaks on paragraph boundaries (blank lines, then single newlines);
+    a paragraph that is too long on its own is split on sentences, then hard-cut
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
+    paragraphs = [p for p in re.split(r'\n\s*\n', text) if p.strip()]
+    pieces = []
+    for paragraph in paragraphs:
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for part in re.split(r'(?<=[.!?])\s+|\n', paragraph):
+            while len(part) > max_chars:
+                pieces.append(part[:max_chars])
+                part = part[max_chars:]
+            if part.strip():
+                pieces.append(part)
+
+    # Pack pieces into chunks up to the budget
+    chunks = []
+    current = []
+    current_len = 0
+    for piece in pieces:
+        if current and current_len + len(piece) + 2 > max_chars:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_len = 0
+        current.append(piece)
+        current_len += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return chunks
+
+def content_defined_chunks(text, target_tokens=CHUNK_TOKENS):
+    """
+    Split text where a rolling (gear) hash of the content hits a boundary
+    Boundaries depend only on nearby text, so an edit changes the chunks
+    around it and leaves the rest identical (and their summaries reusable)
+    Cuts are moved to the next newline (or space) so words stay whole
+    """
+    target_chars = target_tokens * CHARS_PER_TOKEN
+    min_chars = target_chars // 4
+    max_chars = target_chars * 2
+    # Boundary chance per position gives an average chunk near target_chars;
+    # the mask tests the high bits, which depend on the whole 32-char window
+    bits = max(1, (target_chars - min_chars).bit_length() - 1)
+    mask = ((1 << bits) - 1) << (32 - bits)
+
+    chunks = []
+    start = 0
+    position = 0
+    rolling = 0
+    length = len(text)
+    while position < length:
+        rolling = ((rolling << 1) + GEAR[ord(text[position]) & 0xFF]) & 0xFFFFFFFF
+        position += 1
+        size = position - start
+
+        if size < min_chars:
+            continue
+        if (rolling & mask) != 0 and size < max_chars:
+            continue
+
+        cut = position
+        if size < max_chars:
+            window = text[position:position + BOUNDARY_SEARCH_CHARS]
+            newline = window.find("\n")
+            space = window.find(" ")
+            if newline != -1:
+                cut = position + newline + 1
+            elif space != -1:
+                cut = position + space + 1
+
+        chunks.append(text[start:cut])
+        start = cut
+        position = cut
+        rolling = 0
+
+    if start < length:
+        chunks.append(text[start:])
+    return chunks
+
+def chunk_request(chunk, index=None, total=None):
+    """
+    Chat completion arguments for summarizing one chunk (map step)
+    Without index/total the prompt depends only on the chunk, which keeps
+    cached chunk summaries valid when chunks before it change
+    """
+    if index is None:
+        position = "This is one section of a longer document."
+    else:
+        position = f"This is section {index} of {total} of a longer document."
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You summarize sections of long documents accurately."},
+            {"role": "user", "content": f"""{position}
+Summarize it in a short paragraph plus bullet points.
+Keep key facts, figures, names, decisions and conclusions.
+
+Section:
+{chunk}"""}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 300
+    }
+
+def combine_request(summaries_text):
+    """Chat completion arguments for merging a group of section summaries (reduce step)"""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You merge section summaries into one faithful summary."},
+            {"role": "user", "content": f"""These are summaries of consecutive sections of one document.
+Merge them into a single summary that keeps every important point, in order.
+
+Section summaries:
+{summaries_text}"""}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 500
+    }
+
+class UsageTally:
+    """Adds up tokens, cost and calls across the requests of one document"""
+
+    def __init__(self):
+        self.tokens = 0
+        self.cost = 0.0
+        self.calls = 0
+        self.cached_calls = 0
+
+    def add(self, response):
+        self.tokens += response.usage.total_tokens
+        self.cost += response_cost(response)
+        self.calls += 1
+        if is_cached(response):
+            self.cached_calls += 1
+
+def run_requests(client, requests, tally):
+    """Run chat completion requests concurrently, returning contents in order"""
+    with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+        responses = list(pool.map(lambda r: create_chat_completion(client, **r), requests))
+    for response in responses:
+        tally.add(response)
+    return [response.choices[0].message.content for response in responses]
+
+def join_summaries(summaries):
+    return "\n\n".join(f"[Part {i}]\n{summary}" for i, summary in enumerate(summaries, 1))
+
+def group_by_budget(summaries, max_tokens):
+    """Group consecutive summaries so each group fits in one reduce request"""
+    groups = []
+    current = []
+    current_tokens = 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def make_chunks(text, chunking="paragraph"):
+    return content_defined_chunks(text) if chunking == "cdc" else split_into_chunks(text)
+
+def map_requests(chunks, chunking="paragraph"):
+    """Map step requests; content-defined chunks leave out their position so they cache per chunk"""
+    if chunking == "cdc":
+        return [chunk_request(chunk) for chunk in chunks]
+    return [chunk_request(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1)]
+
+def estimate_map_reduce(text, final_request, chunking="paragraph"):
+    """
+    Estimated (prompt tokens, completion tokens) of map_reduce_summarize on
+    text, without calling the model
+    Counts the real chunks: those already in the response cache cost
+    nothing, every other completion is assumed to use its full max_tokens
+    """
+    def overhead(request):
+        return estimate_request_tokens(request) - request["max_tokens"]
+
+    prompt = 0
+    completion = 0
+    summary_tokens = 0
+    for request in map_requests(make_chunks(text, chunking), chunking):
+        hit = lookup_cache(request)
+        if hit is not None:
+            summary_tokens += estimate_tokens(hit.choices[0].message.content)
+            continue
+        prompt += overhead(request)
+        completion += request["max_tokens"]
+        summary_tokens += request["max_tokens"]
+
+    merge_request = combine_request("")
+    while summary_tokens > REDUCE_INPUT_TOKENS:
+        groups = math.ceil(summary_tokens / REDUCE_INPUT_TOKENS)
+        prompt += summary_tokens + groups * overhead(merge_request)
+        completion += groups * merge_request["max_tokens"]
+        summary_tokens = groups * merge_request["max_tokens"]
+
+    last_request = final_request("")
+    prompt += summary_tokens + overhead(last_request)
+    completion += last_request["max_tokens"]
+    return prompt, completion
+
+def map_reduce_summarize(client, text, final_request, chunks=None, chunking="paragraph"):
+    """
+    Summarize a document of any length
+    - map: summarize each chunk concurrently
+    - reduce: merge chunk summaries in rounds until they fit in one request
+    - final: final_request(combined_summaries) produces the output format
+    chunking="cdc" uses content-defined chunks whose requests depend only on
+    their text (cached per chunk), so re-summarizing an edited document only pays for the changed chunks
+    Returns a result dict with the summary and rolled-up tokens/cost
+    """
+    tally = UsageTally()
+    try:
+        if chunks is None:
+            chunks = make_chunks(text, chunking)
+        cached_before = tally.cached_calls
+        summaries = run_requests(client, map_requests(chunks, chunking), tally)
+        chunks_reused = tally.cached_calls - cached_before if chunking == "cdc" else 0
+
+        reduce_rounds = 0
+        while estimate_tokens(join_summaries(summaries)) > REDUCE_INPUT_TOKENS and len(summaries) > 1:
+            groups = group_by_budget(summaries, REDUCE_INPUT_TOKENS)
+            summaries = run_requests(
+                client,
+                [combine_request(join_summaries(group)) for group in groups],
+                tally
+            )
+            reduce_rounds += 1
+
+        response = create_chat_completion(client, **final_request(join_summaries(summaries)))
+        tally.add(response)
+
+        return {
+            "success": True,
+            "summary": response.choices[0].message.content,
+            "tokens": tally.tokens,
+            "cost": tally.cost,
+            "cached": tally.cached_calls == tally.calls,
+            "chunks": len(chunks),
+            "chunks_reused": chunks_reused,
+            "reduce_rounds": reduce_rounds,
+            "llm_calls": tally.calls
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "tokens": tally.tokens,
+            "cost": tally.cost
+        }
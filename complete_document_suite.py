@@ -1,20 +1,28 @@
 import os
+import time
 from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
 # Import functions from other modules
 from text_extraction import read_document
+from llm_client import create_chat_completion, is_cached, response_cost
 from batch_processor import batch_summarize, process_batch
 from export_formats import export_as_json, export_as_markdown, export_as_html
+from document_qa import qa_session
+from doc_search import search_index, search
+
+# Characters of a document sent to the model (extraction stops here too)
+MAX_DOCUMENT_CHARS = 15000
 
 # Session tracking
 session = {
     "operations": 0,
     "total_cost": 0.0,
+    "cache_hits": 0,
     "start_time": datetime.now()
 }
 
@@ -33,15 +41,16 @@ def show_menu():
     print("   5. Compare Two Documents")
     print("   6. Synthesize Multiple Documents")
     print("   7. Batch Process Folder")
+    print("   8. Search Processed Documents")
     print("\n⚙️  SYSTEM:")
-    print("   8. Show Session Statistics")
-    print("   9. Exit")
+    print("   9. Show Session Statistics")
+    print("   10. Exit")
     print("="*70)
 
 def quick_summary(file_path):
     """Generate a quick executive summary"""
     print(f"\n📖 Reading document...")
-    doc = read_document(file_path)
+    doc = read_document(file_path, max_chars=MAX_DOCUMENT_CHARS)
     
     if not doc['success']:
         print(f"❌ Failed: {doc['error']}")
@@ -50,10 +59,11 @@ def quick_summary(file_path):
     print(f"✅ Loaded {doc['word_count']} words")
     print("\n🔄 Generating executive summary...")
     
-    text = doc['text'][:15000]
+    text = doc['text'][:MAX_DOCUMENT_CHARS]
     
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Create concise executive summaries."},
@@ -64,11 +74,12 @@ def quick_summary(file_path):
         )
         
         summary = response.choices[0].message.content
-        cost = (response.usage.prompt_tokens / 1000) * 0.00015 + \
-               (response.usage.completion_tokens / 1000) * 0.0006
+        cost = response_cost(response)
         
         session['operations'] += 1
         session['total_cost'] += cost
+        if is_cached(response):
+            session['cache_hits'] += 1
         
         print("\n" + "┏" + "━"*68 + "┓")
         print("┃ 📄 EXECUTIVE SUMMARY" + " "*47 + "┃")
@@ -99,7 +110,7 @@ def quick_summary(file_path):
 def detailed_analysis(file_path):
     """Provide detailed document analysis"""
     print(f"\n📖 Reading document...")
-    doc = read_document(file_path)
+    doc = read_document(file_path, max_chars=MAX_DOCUMENT_CHARS)
     
     if not doc['success']:
         print(f"❌ Failed: {doc['error']}")
@@ -108,7 +119,7 @@ def detailed_analysis(file_path):
     print(f"✅ Loaded {doc['word_count']} words")
     print("\n🔄 Performing detailed analysis...")
     
-    text = doc['text'][:15000]
+    text = doc['text'][:MAX_DOCUMENT_CHARS]
     
     prompt = """Analyze this document in detail:
 
@@ -122,7 +133,8 @@ def detailed_analysis(file_path):
 Be specific and cite examples from the document."""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            client,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a thorough document analyst."},
@@ -133,11 +145,12 @@ Be specific and cite examples from the document."""
         )
         
         analysis = response.choices[0].message.content
-        cost = (response.usage.prompt_tokens / 1000) * 0.00015 + \
-               (response.usage.completion_tokens / 1000) * 0.0006
+        cost = response_cost(response)
         
         session['operations'] += 1
         session['total_cost'] += cost
+        if is_cached(response):
+            session['cache_hits'] += 1
         
         print("\n" + "┏" + "━"*68 + "┓")
         print("┃ 🔍 DETAILED ANALYSIS" + " "*48 + "┃")
@@ -168,6 +181,39 @@ Be specific and cite examples from the document."""
     except Exception as e:
         print(f"❌ Error: {e}")
 
+def search_documents():
+    """Search documents indexed by batch processing (BM25 over text and summaries)"""
+    if search_index is None:
+        print("❌ Search index disabled (SEARCH_INDEX=0)")
+        return
+    
+    count = search_index.document_count()
+    if count == 0:
+        print("\n💡 Nothing indexed yet - run Batch Process Folder first")
+        return
+    
+    query = input(f"\n🔎 Search {count} documents: ").strip()
+    if not query:
+        return
+    
+    start = time.perf_counter()
+    hits = search(query, 10)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    if not hits:
+        print(f"\n❌ No matches ({elapsed:.1f} ms)")
+        return
+    
+    print("\n" + "┏" + "━"*68 + "┓")
+    print(f"┃ {'🔎 ' + str(len(hits)) + ' results (' + format(elapsed, '.1f') + ' ms)':<65} ┃")
+    print("┣" + "━"*68 + "┫")
+    for rank, hit in enumerate(hits, 1):
+        title = f"{rank}. {hit['filename']}"
+        print(f"┃ {title[:56]:<56} {hit['score']:>9.3f} ┃")
+        snippet = " ".join((hit['snippet'] or "").split())
+        print(f"┃    {snippet[:63]:<63} ┃")
+    print("┗" + "━"*68 + "┛")
+
 def show_session_stats():
     """Display session statistics"""
     duration = (datetime.now() - session['start_time']).total_seconds()
@@ -177,6 +223,7 @@ def show_session_stats():
     print("┣" + "━"*68 + "┫")
     print(f"┃ Operations performed: {session['operations']:<47} ┃")
     print(f"┃ Total cost: ${session['total_cost']:.6f}" + " "*48 + "┃")
+    print(f"┃ Cache hits (no cost): {session['cache_hits']:<44} ┃")
     print(f"┃ Session duration: {int(duration//60)}m {int(duration%60)}s" + " "*(47-len(f"{int(duration//60)}m {int(duration%60)}s")) + "┃")
     print("┗" + "━"*68 + "┛")
 
@@ -224,7 +271,7 @@ def main():
     while True:
         show_menu()
         
-        choice = input("\nSelect operation (1-9): ").strip()
+        choice = input("\nSelect operation (1-10): ").strip()
         
         if choice == '1':
             file_path = select_document()
@@ -237,8 +284,12 @@ def main():
                 detailed_analysis(file_path)
         
         elif choice == '3':
-            print("\n💡 Q&A Mode is available in document_qa.py")
-            print("   Run: python document_qa.py")
+            file_path = select_document()
+            if file_path:
+                qa_stats = qa_session(file_path)
+                session['operations'] += qa_stats['questions']
+                session['total_cost'] += qa_stats['cost']
+                session['cache_hits'] += qa_stats['cache_hits']
         
         elif choice == '4':
             print("\n💡 Export functionality is available in export_formats.py")
@@ -257,16 +308,19 @@ def main():
             print("   Run: python batch_processor.py")
         
         elif choice == '8':
-            show_session_stats()
+            search_documents()
         
         elif choice == '9':
             show_session_stats()
+        
+        elif choice == '10':
+            show_session_stats()
             print("\n👋 Thanks for using Document Processing Suite!")
             print("="*70)
             break
         
         else:
-            print("❌ Invalid choice! Please select 1-9.")
+            print("❌ Invalid choice! Please select 1-10.")
         
         input("\n👉 Press Enter to continue...")
 
@@ -0,0 +1,111 @@
+import zlib
+import heapq
+import numpy as np
+from doc_similarity import paragraph_terms
+
+# Hashed feature space for corpus vectors (documents only store the columns they use)
+CORPUS_DIM = 2 ** 14
+# Rows multiplied at a time when computing similarities
+BLOCK_ROWS = 512
+
+def term_columns(text, dim=CORPUS_DIM):
+    terms = paragraph_terms(text)
+    return np.fromiter((zlib.crc32(t.encode("utf-8")) % dim for t in terms), dtype=np.int64, count=len(terms))
+
+class SparseRows:
+    """
+    L2-normalized document vectors in CSR form (indptr, indices, data)
+    Memory grows with the distinct terms of each document, not with
+    CORPUS_DIM; dense() expands one block of rows for a matrix product
+    """
+
+    def __init__(self, indptr, indices, data, dim):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.dim = dim
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def dense(self, start, stop):
+        stop = min(stop, len(self))
+        block = np.zeros((stop - start, self.dim), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        block[rows, self.indices[lo:hi]] = self.data[lo:hi]
+        return block
+
+class CorpusVectors:
+    """
+    Hashed TF-IDF vectors for a corpus, kept as sparse rows
+    Add documents one at a time with set_document(), then call finish()
+    to apply IDF weights and L2-normalize the rows
+    """
+
+    def __init__(self, count, dim=CORPUS_DIM):
+        self.count = count
+        self.dim = dim
+        self.rows = [(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))] * count
+        self.document_frequency = np.zeros(dim, dtype=np.int64)
+
+    def set_document(self, row, text):
+        columns, counts = np.unique(term_columns(text, self.dim), return_counts=True)
+        self.document_frequency[columns] += 1
+        self.rows[row] = (columns.astype(np.int32), np.log1p(counts).astype(np.float32))
+
+    def finish(self):
+        lengths = np.array([len(columns) for columns, _ in self.rows], dtype=np.int64)
+        indptr = np.zeros(self.count + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate([columns for columns, _ in self.rows])
+        data = np.concatenate([values for _, values in self.rows])
+        self.rows = None
+
+        idf = (np.log((1 + self.count) / (1 + self.document_frequency)) + 1.0).astype(np.float32)
+        data *= idf[indices]
+        row_ids = np.repeat(np.arange(self.count), lengths)
+        norms = np.sqrt(np.bincount(row_ids, weights=data.astype(np.float64) ** 2, minlength=self.count))
+        data /= np.where(norms == 0, 1.0, norms)[row_ids].astype(np.float32)
+        return SparseRows(indptr, indices, data, self.dim)
+
+def best_pairs(scores, rows, cols, k, largest):
+    """The k highest (or lowest) scoring pairs of one block as (score, i, j)"""
+    if len(scores) == 0:
+        return []
+    k = min(k, len(scores))
+    order = np.argpartition(-scores if largest else scores, k - 1)[:k]
+    return [(float(scores[t]), int(rows[t]), int(cols[t])) for t in order]
+
+def top_pairs(vectors, top_k=10, valid=None, block_rows=BLOCK_ROWS):
+    """
+    All-pairs cosine similarity of SparseRows, block by block, keeping only a
+    running top_k; memory stays at two dense row blocks plus one result block
+    and nothing of size n×n is stored
+    Pairs involving rows where valid is False (e.g. unreadable documents) are ignored
+    Returns (most similar pairs, most divergent pairs), lists of (score, i, j), best first
+    """
+    n = len(vectors)
+    valid = np.ones(n, dtype=bool) if valid is None else np.asarray(valid)
+
+    most_similar, most_divergent = [], []
+    for i0 in range(0, n, block_rows):
+        a = vectors.dense(i0, i0 + block_rows)
+        for j0 in range(i0, n, block_rows):
+            b = a if j0 == i0 else vectors.dense(j0, j0 + block_rows)
+            block = a @ b.T
+
+            # Each unordered pair once: upper triangle on the diagonal blocks
+            if i0 == j0:
+                rows, cols = np.triu_indices(len(a), k=1, m=len(b))
+            else:
+                rows, cols = np.divmod(np.arange(block.size), len(b))
+            rows, cols = rows + i0, cols + j0
+            keep = valid[rows] & valid[cols]
+            rows, cols = rows[keep], cols[keep]
+            scores = block[rows - i0, cols - j0]
+
+            most_similar = heapq.nlargest(top_k, most_similar + best_pairs(scores, rows, cols, top_k, True))
+            most_divergent = heapq.nsmallest(top_k, most_divergent + best_pairs(scores, rows, cols, top_k, False))
+
+    return most_similar, most_divergent
@@ -0,0 +1,108 @@
+import re
+import zlib
+import hashlib
+import numpy as np
+
+# Words per shingle
+SHINGLE_WORDS = 5
+# MinHash signature length, split into BANDS bands of NUM_PERM // BANDS rows for LSH
+NUM_PERM = 128
+BANDS = 16
+# Estimated Jaccard similarity at which two documents count as the same
+NEAR_DUPLICATE_THRESHOLD = 0.9
+# Shingles hashed per block (keeps memory flat on very long documents)
+SHINGLE_BLOCK = 4096
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+_perm_random = np.random.RandomState(0x5EED)
+PERM_A = _perm_random.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _perm_random.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+def normalize_text(text):
+    """Lowercase words only, so copies that differ in spacing or punctuation match"""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def shingle_hashes(text, size=SHINGLE_WORDS):
+    """32-bit hashes of the distinct word shingles in text"""
+    words = normalize_text(text).split()
+    if len(words) < size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+def minhash(text):
+    """MinHash signature (NUM_PERM values) of the text's shingles"""
+    hashes = shingle_hashes(text)
+    signature = np.full(NUM_PERM, MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), SHINGLE_BLOCK):
+        block = hashes[start:start + SHINGLE_BLOCK, None]
+        # uint64 overflow wraps, as in the usual numpy MinHash
+        permuted = ((block * PERM_A + PERM_B) % MERSENNE_PRIME) & MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature
+
+def fingerprint(text):
+    """Everything DuplicateIndex needs about a document: (exact hash, MinHash signature)"""
+    return text_hash(text), minhash(text)
+
+class DuplicateIndex:
+    """
+    Finds documents already seen with the same (normalized) text, or nearly
+    the same text (MinHash + LSH banding over word shingles)
+    The first document of each group is its canonical member
+    """
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, bands=BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.exact = {}
+        self.signatures = {}
+        self.buckets = [{} for _ in range(bands)]
+        self.groups = {}
+
+    def add(self, key, fingerprint):
+        """
+        Register a document; returns (canonical key, kind, similarity) if it
+        duplicates an earlier one (kind "exact" or "near"), else None
+        """
+        digest, signature = fingerprint
+        if digest in self.exact:
+            # A copy of a near duplicate is only near its canonical document
+            canonical, kind, similarity = self.exact[digest]
+            return self.join(canonical, key, kind, similarity)
+
+        band_keys = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates = set()
+        for bucket, band_key in zip(self.buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+
+        best, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = float(np.mean(self.signatures[candidate] == signature))
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None and best_similarity >= self.threshold:
+            self.exact[digest] = (best, "near", best_similarity)
+            return self.join(best, key, "near", best_similarity)
+
+        # A new canonical document
+        self.exact[digest] = (key, "exact", 1.0)
+        self.signatures[key] = signature
+        for bucket, band_key in zip(self.buckets, band_keys):
+            bucket.setdefault(band_key, []).append(key)
+        return None
+
+    def join(self, canonical, key, kind, similarity):
+        self.groups.setdefault(canonical, []).append(
+            {"filename": key, "match": kind, "similarity": round(similarity, 3)}
+        )
+        return canonical, kind, similarity
+
+    def duplicate_count(self):
+        return sum(len(members) for members in self.groups.values())
@@ -0,0 +1,51 @@
+import os
+import json
+from datetime import datetime
+from disk_cache import DiskCache
+
+# Persistent per-document digests keyed by file content hash (set DIGEST_STORE=0 to disable)
+digest_store = None
+if os.getenv("DIGEST_STORE", "1") != "0":
+    digest_store = DiskCache(
+        os.getenv("DIGEST_STORE_PATH", os.path.join(".cache", "digests.sqlite")),
+        max_bytes=int(os.getenv("DIGEST_STORE_MAX_MB", "200")) * 1024 * 1024,
+        table="digests"
+    )
+
+def make_digest(summary, filename, source):
+    return {
+        "summary": summary,
+        "filename": filename,
+        "source": source,
+        "created_at": datetime.now().isoformat()
+    }
+
+def get_digest(content_hash):
+    if digest_store is None or content_hash is None:
+        return None
+    value = digest_store.get(content_hash)
+    return json.loads(value) if value is not None else None
+
+def put_digest(content_hash, digest):
+    if digest_store is None or content_hash is None:
+        return
+    digest_store.set(content_hash, json.dumps(digest, ensure_ascii=False))
+
+def wants_digest(summary_result):
+    """
+    True if store_summary_digest would keep this result
+    A summary reused from a near or prefix duplicate describes another
+    document, so it is not stored under this one's hash
+    """
+    if digest_store is None or not summary_result.get('success') or not summary_result.get('summary'):
+        return False
+    return not summary_result.get('duplicate_of') or summary_result.get('match') == "exact"
+
+def store_summary_digest(content_hash, filename, summary_result, source="batch"):
+    """Keep a successful batch summary as the document's digest (see wants_digest)"""
+    if wants_digest(summary_result):
+        put_digest(content_hash, make_digest(summary_result['summary'], filename, source))
+
+def digest_text(digest):
+    """Digest as prompt text (the summary already lists the key points)"""
+    return digest["summary"].strip()
@@ -0,0 +1,90 @@
+import os
+import time
+import sqlite3
+import threading
+
+class DiskCache:
+    """
+    Persistent key/value store in SQLite with size-based LRU eviction
+    Values are strings (callers store JSON); the file is created on first use
+    """
+
+    def __init__(self, path, max_bytes=500 * 1024 * 1024, table="cache"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self.lock = threading.Lock()
+        self.conn = None
+        self.total_bytes = None
+
+    def _connect(self):
+        if self.conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_lru ON {self.table}(last_access)")
+            self.conn.commit()
+            row = self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+            self.total_bytes = row[0]
+        return self.conn
+
+    def get(self, key):
+        """Return the stored value or None, marking the entry as recently used"""
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return row[0]
+
+    def set(self, key, value):
+        """Store a value, evicting least recently used entries past max_bytes"""
+        size = len(value.encode("utf-8"))
+        with self.lock:
+            conn = self._connect()
+            old = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            self._evict(conn)
+            conn.commit()
+
+    def delete(self, key):
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.total_bytes -= row[0]
+                conn.commit()
+
+    def _evict(self, conn):
+        while self.total_bytes > self.max_bytes:
+            rows = conn.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        with self.lock:
+            conn = self._connect()
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return {"entries": count, "bytes": self.total_bytes}
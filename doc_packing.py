@@ -0,0 +1,155 @@
+import json
+import asyncio
+from llm_client import estimate_tokens, response_cost, is_cached
+
+# Documents up to this size are packed together with others
+SMALL_DOC_TOKENS = 1500
+# Input budget for the documents in one packed request
+PACK_TOKENS = 6000
+# Most documents in one packed request (each gets its own summary)
+PACK_MAX_DOCS = 12
+# Output tokens allowed per packed document
+PACK_SUMMARY_TOKENS = 250
+# Longest a document waits for others to share its request
+PACK_WAIT_SECONDS = 0.5
+
+def packed_request(texts):
+    """Chat completion arguments summarizing several short documents at once"""
+    sections = "\n\n".join(
+        f"=== DOCUMENT {i} ===\n{text}\n=== END DOCUMENT {i} ===" for i, text in enumerate(texts, 1)
+    )
+    prompt = f"""Below are {len(texts)} separate short documents, each between
+=== DOCUMENT n === and === END DOCUMENT n === markers.
+Summarize each one on its own. Each summary should include:
+- Main topic (1 sentence)
+- Key points (3-5 bullet points)
+- Conclusion or outcome (1 sentence)
+
+Reply with JSON only, in this form:
+{{"summaries": [{{"id": 1, "summary": "..."}}, {{"id": 2, "summary": "..."}}]}}
+with exactly one entry per document, ids 1 to {len(texts)}."""
+
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You create concise, accurate summaries quickly."},
+            {"role": "user", "content": f"{prompt}\n\n{sections}"}
+        ],
+        "temperature": 0.4,
+        "max_tokens": PACK_SUMMARY_TOKENS * len(texts),
+        "response_format": {"type": "json_object"}
+    }
+
+def parse_packed_response(content, count):
+    """List of `count` summaries in document order, or None if the reply doesn't parse"""
+    try:
+        entries = json.loads(content)["summaries"]
+        summaries = {int(entry["id"]): str(entry["summary"]).strip() for entry in entries}
+    except (ValueError, KeyError, TypeError):
+        return None
+    if sorted(summaries) != list(range(1, count + 1)) or not all(summaries.values()):
+        return None
+    return [summaries[i] for i in range(1, count + 1)]
+
+class DocumentPacker:
+    """
+    Collects short documents from concurrent callers and summarizes them
+    together in one request (fewer round trips, one copy of the instructions)
+    - call(request): coroutine returning a chat completion response
+    - fallback(text, filename): coroutine summarizing one document alone,
+      used when a packed reply doesn't parse or the request fails
+    A pack is sent once it is full or PACK_WAIT_SECONDS after its first document
+    """
+
+    def __init__(self, call, fallback, max_tokens=PACK_TOKENS, max_docs=PACK_MAX_DOCS,
+                 wait=PACK_WAIT_SECONDS):
+        self.call = call
+        self.fallback = fallback
+        self.max_tokens = max_tokens
+        self.max_docs = max_docs
+        self.wait = wait
+        self.pending = []
+        self.pending_tokens = 0
+        self.timer = None
+        self.tasks = set()
+        self.packs = 0
+        self.fallbacks = 0
+
+    async def submit(self, text, filename):
+        """Summarize one short document; returns a batch result dict"""
+        tokens = estimate_tokens(text)
+        if self.pending and self.pending_tokens + tokens > self.max_tokens:
+            self.flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((text, filename, tokens, future))
+        self.pending_tokens += tokens
+        if len(self.pending) >= self.max_docs:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.wait, self.flush)
+        return await future
+
+    def flush(self):
+        """Send whatever is pending as one pack"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        docs, self.pending, self.pending_tokens = self.pending, [], 0
+        task = asyncio.ensure_future(self.run_pack(docs))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_pack(self, docs):
+        try:
+            results = await self.summarize_pack(docs)
+        except BaseException:
+            for _, _, _, future in docs:
+                if not future.done():
+                    future.cancel()
+            raise
+        for (_, _, _, future), result in zip(docs, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def summarize_pack(self, docs):
+        if len(docs) == 1:
+            text, filename, _, _ = docs[0]
+            return [await self.fallback(text, filename)]
+
+        response = summaries = None
+        try:
+            response = await self.call(packed_request([text for text, _, _, _ in docs]))
+            summaries = parse_packed_response(response.choices[0].message.content, len(docs))
+        except Exception:
+            pass
+
+        # Each document carries its share of the request, by input size
+        total_tokens = sum(tokens for _, _, tokens, _ in docs)
+        cost = response_cost(response) if response is not None else 0.0
+
+        if summaries is None:
+            self.fallbacks += 1
+            results = await asyncio.gather(*(self.fallback(text, filename) for text, filename, _, _ in docs))
+            # The unusable packed reply was still paid for
+            for (_, _, tokens, _), result in zip(docs, results):
+                if result['success']:
+                    result['cost'] += cost * tokens / total_tokens
+            return results
+
+        self.packs += 1
+        results = []
+        for (_, filename, tokens, _), summary in zip(docs, summaries):
+            share = tokens / total_tokens
+            results.append({
+                "success": True,
+                "filename": filename,
+                "summary": summary,
+                "tokens": round(response.usage.total_tokens * share),
+                "cost": cost * share,
+                "cached": is_cached(response),
+                "packed": len(docs)
+            })
+        return results
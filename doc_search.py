@@ -0,0 +1,391 @@
+import os
+import re
+import sys
+import sqlite3
+import threading
+from itertools import groupby, chain
+from collections import Counter
+import numpy as np
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A word in a document's summary counts as this many occurrences in its text
+SUMMARY_WEIGHT = 2
+# Documents buffered in memory before their postings are written
+FLUSH_DOCS = 500
+# Characters of each summary kept to show with search results
+SNIPPET_CHARS = 300
+# SQLite variables per IN (...) lookup
+LOOKUP_BATCH = 500
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def term_counts(text):
+    """Term frequencies of a text (what the index stores per document)"""
+    return Counter(tokenize(text))
+
+def encode_varints(values):
+    """
+    LEB128 varints of non-negative integers (7 bits per byte, high bit set on
+    all but the last byte), vectorized; returns (bytes, byte offset of each value)
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b"", np.zeros(1, dtype=np.int64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        sizes += rest > 0
+        rest >>= np.uint64(7)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    out = np.empty(offsets[-1], dtype=np.uint8)
+    for group in range(int(sizes.max())):
+        mask = sizes > group
+        part = (values[mask] >> np.uint64(7 * group)) & np.uint64(0x7F)
+        more = np.where(sizes[mask] - 1 > group, np.uint64(0x80), np.uint64(0))
+        out[offsets[:-1][mask] + group] = (part | more).astype(np.uint8)
+    return out.tobytes(), offsets
+
+def decode_varints(data):
+    """Inverse of encode_varints: array of int64 values"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    last = raw < 0x80
+    if last.all():
+        return raw.astype(np.int64)
+    # Fold each continuation byte onto the bytes after it, one byte per
+    # pass (a value's first byte holds its lowest 7 bits)
+    low = (raw & 0x7F).astype(np.int64)
+    value = low.copy()
+    continued = np.flatnonzero(~last)
+    for _ in range(int(np.diff(np.flatnonzero(np.concatenate(([True], last)))).max()) - 1):
+        value[continued] = low[continued] | (value[continued + 1] << 7)
+    first = np.empty(len(raw), dtype=bool)
+    first[0] = True
+    first[1:] = last[:-1]
+    return value[first]
+
+def encode_postings(term_ids, doc_ids, frequencies, previous_docs=None):
+    """
+    Postings of many terms encoded in one pass; arrays sorted by (term, doc id)
+    Each term's run is (doc id gap, frequency) varint pairs, its first gap
+    taken from previous_docs (one per run, default 0)
+    Returns (index of each run's first entry, byte bounds of the runs, bytes)
+    """
+    firsts = np.flatnonzero(np.diff(term_ids, prepend=-1))
+    previous = np.zeros_like(doc_ids)
+    previous[1:] = doc_ids[:-1]
+    previous[firsts] = 0 if previous_docs is None else previous_docs
+    pairs = np.empty(2 * len(doc_ids), dtype=np.int64)
+    pairs[0::2] = doc_ids - previous
+    pairs[1::2] = frequencies
+    data, offsets = encode_varints(pairs)
+    return firsts, offsets[2 * np.append(firsts, len(doc_ids))].tolist(), data
+
+def decode_postings(data):
+    """(doc ids, term frequencies) of a postings blob"""
+    values = decode_varints(data)
+    return np.cumsum(values[0::2]), values[1::2]
+
+class SearchIndex:
+    """
+    Persistent inverted index with BM25 ranking over document text and summaries
+    Stored in SQLite: a docs table, and per term a postings list of
+    varint-encoded (doc id gap, frequency) pairs. New documents get
+    increasing doc ids, so each flush just adds one more segment to a
+    term's list (gaps continue from the term's last doc id); the segments
+    of a term concatenated in order decode as one list
+    A re-indexed or removed document is only marked deleted; compact()
+    drops deleted documents and merges each term's segments into one
+    Documents are buffered and written by flush() (automatically every
+    FLUSH_DOCS documents, and before each search)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.pending = []
+        # Per-document stats for scoring, loaded on first search and
+        # reloaded when another flush changed the index
+        self.generation = None
+        self.lengths = None
+        self.live = None
+        self.live_count = 0
+        self.average_length = 0.0
+
+    def _connect(self):
+        if self.conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                filename TEXT,
+                content_hash TEXT,
+                length INTEGER NOT NULL,
+                snippet TEXT,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS docs_path ON docs(path)")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                last_doc INTEGER NOT NULL,
+                segments INTEGER NOT NULL
+            )""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                first_doc INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (term, first_doc)
+            )""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        return self.conn
+
+    def add_document(self, path, text="", summary="", content_hash=None, filename=None, terms=None):
+        """
+        Queue a document for indexing (replaces an earlier version of the same path)
+        Pass terms=term_counts(text) instead of text to avoid keeping the text around
+        """
+        counts = Counter(terms) if terms is not None else term_counts(text)
+        for term, count in term_counts(summary or "").items():
+            counts[term] += SUMMARY_WEIGHT * count
+        with self.lock:
+            self.pending.append({
+                "path": os.path.abspath(path),
+                "filename": filename or os.path.basename(path),
+                "content_hash": content_hash,
+                "snippet": (summary or text)[:SNIPPET_CHARS],
+                "counts": counts
+            })
+            if len(self.pending) >= FLUSH_DOCS:
+                self._flush()
+
+    def remove_document(self, path):
+        with self.lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE docs SET deleted = 1 WHERE path = ? AND deleted = 0", (os.path.abspath(path),))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            conn.execute("COMMIT")
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            next_id = conn.execute("SELECT COALESCE(MAX(doc_id), 0) + 1 FROM docs").fetchone()[0]
+            term_numbers = {}
+            entries = ([], [], [])
+            for doc in self.pending:
+                conn.execute("UPDATE docs SET deleted = 1 WHERE path = ? AND deleted = 0", (doc["path"],))
+                conn.execute(
+                    "INSERT INTO docs (doc_id, path, filename, content_hash, length, snippet) VALUES (?, ?, ?, ?, ?, ?)",
+                    (next_id, doc["path"], doc["filename"], doc["content_hash"],
+                     sum(doc["counts"].values()), doc["snippet"])
+                )
+                for term, count in doc["counts"].items():
+                    entries[0].append(term_numbers.setdefault(term, len(term_numbers)))
+                    entries[1].append(next_id)
+                    entries[2].append(count)
+                next_id += 1
+
+            terms = list(term_numbers)
+            last_docs = {}
+            for start in range(0, len(terms), LOOKUP_BATCH):
+                batch = terms[start:start + LOOKUP_BATCH]
+                last_docs.update(conn.execute(
+                    f"SELECT term, last_doc FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch
+                ).fetchall())
+
+            # One new segment per term, gaps continuing from its last stored doc id
+            term_ids, doc_ids, frequencies = (np.array(column, dtype=np.int64) for column in entries)
+            order = np.lexsort((doc_ids, term_ids))
+            term_ids, doc_ids, frequencies = term_ids[order], doc_ids[order], frequencies[order]
+            run_terms = term_ids[np.flatnonzero(np.diff(term_ids, prepend=-1))]
+            firsts, bounds, data = encode_postings(
+                term_ids, doc_ids, frequencies, [last_docs.get(terms[t], 0) for t in run_terms.tolist()]
+            )
+            segment_terms = [terms[t] for t in term_ids[firsts].tolist()]
+            first_docs = doc_ids[firsts].tolist()
+            last_docs = doc_ids[np.append(firsts, len(doc_ids))[1:] - 1].tolist()
+
+            conn.executemany(
+                """INSERT INTO terms (term, last_doc, segments) VALUES (?, ?, 1)
+                   ON CONFLICT(term) DO UPDATE SET last_doc = excluded.last_doc, segments = segments + 1""",
+                zip(segment_terms, last_docs)
+            )
+            conn.executemany(
+                "INSERT INTO postings (term, first_doc, data) VALUES (?, ?, ?)",
+                ((term, first_doc, data[bounds[i]:bounds[i + 1]])
+                 for i, (term, first_doc) in enumerate(zip(segment_terms, first_docs)))
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.pending = []
+
+    def _load_stats(self, conn):
+        generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        if generation == self.generation:
+            return
+        rows = conn.execute("SELECT doc_id, length, deleted FROM docs").fetchall()
+        rows = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows)).reshape(-1, 3)
+        size = int(rows[:, 0].max()) + 1 if len(rows) else 1
+        self.lengths = np.zeros(size, dtype=np.float32)
+        self.live = np.zeros(size, dtype=bool)
+        if len(rows):
+            self.lengths[rows[:, 0]] = rows[:, 1]
+            self.live[rows[:, 0]] = rows[:, 2] == 0
+        self.live_count = int(self.live.sum())
+        self.average_length = float(self.lengths[self.live].mean()) if self.live_count else 0.0
+        self.generation = generation
+
+    def search(self, query, k=10):
+        """
+        The k best documents for a query by BM25, as dicts with path,
+        filename, score and snippet (the start of the summary), best first
+        """
+        with self.lock:
+            self._flush()
+            conn = self._connect()
+            self._load_stats(conn)
+            if self.live_count == 0:
+                return []
+
+            scores = np.zeros(len(self.lengths), dtype=np.float32)
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / max(self.average_length, 1e-9))
+            for term in set(tokenize(query)):
+                data = self._postings(conn, term)
+                if not data:
+                    continue
+                doc_ids, frequencies = decode_postings(data)
+                keep = self.live[doc_ids]
+                doc_ids, frequencies = doc_ids[keep], frequencies[keep].astype(np.float32)
+                if len(doc_ids) == 0:
+                    continue
+                df = len(doc_ids)
+                idf = np.log(1 + (self.live_count - df + 0.5) / (df + 0.5))
+                scores[doc_ids] += idf * frequencies * (BM25_K1 + 1) / (frequencies + length_norm[doc_ids])
+
+            matched = np.flatnonzero(scores)
+            if len(matched) == 0:
+                return []
+            k = min(k, len(matched))
+            top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+
+            rows = {row[0]: row[1:] for row in conn.execute(
+                f"SELECT doc_id, path, filename, snippet FROM docs WHERE doc_id IN ({','.join('?' * len(top))})",
+                [int(doc_id) for doc_id in top]
+            )}
+            return [
+                {"path": rows[doc_id][0], "filename": rows[doc_id][1],
+                 "score": round(float(scores[doc_id]), 4), "snippet": rows[doc_id][2]}
+                for doc_id in top.tolist()
+            ]
+
+    def _postings(self, conn, term):
+        return b"".join(row[0] for row in conn.execute(
+            "SELECT data FROM postings WHERE term = ? ORDER BY first_doc", (term,)
+        ))
+
+    def compact(self):
+        """
+        Drop deleted documents from the postings and merge every term's
+        segments into one; returns the number of documents dropped
+        """
+        with self.lock:
+            self._flush()
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = np.array([row[0] for row in conn.execute("SELECT doc_id FROM docs WHERE deleted = 1")],
+                                   dtype=np.int64)
+                # Decode every postings list at once: the bytes of all terms in
+                # order, split into runs by counting the varints in each term's bytes
+                rows = conn.execute("SELECT term, data FROM postings ORDER BY term, first_doc").fetchall()
+                terms, term_bytes = [], [0]
+                for term, segments in groupby(rows, key=lambda row: row[0]):
+                    terms.append(term)
+                    term_bytes.append(sum(len(data) for _, data in segments))
+                data = b"".join(data for _, data in rows)
+                del rows
+                value_ends = np.cumsum(np.frombuffer(data, dtype=np.uint8) < 0x80, dtype=np.int64)
+                run_lengths = np.diff(np.concatenate(([0], value_ends))[np.cumsum(term_bytes)]) // 2
+                values = decode_varints(data)
+                totals = np.cumsum(values[0::2])
+                run_starts = np.cumsum(run_lengths) - run_lengths
+                before = np.concatenate(([0], totals))[run_starts]
+                doc_ids = totals - np.repeat(before, run_lengths)
+                term_ids = np.repeat(np.arange(len(terms)), run_lengths)
+                
+                keep = ~np.isin(doc_ids, deleted)
+                term_ids, doc_ids, frequencies = term_ids[keep], doc_ids[keep], values[1::2][keep]
+                firsts, bounds, data = encode_postings(term_ids, doc_ids, frequencies)
+                run_terms = [terms[t] for t in term_ids[firsts].tolist()]
+                lasts = doc_ids[np.append(firsts, len(doc_ids))[1:] - 1].tolist()
+                
+                conn.execute("DELETE FROM postings")
+                conn.execute("DELETE FROM terms")
+                conn.executemany("INSERT INTO terms (term, last_doc, segments) VALUES (?, ?, 1)",
+                                 zip(run_terms, lasts))
+                conn.executemany("INSERT INTO postings (term, first_doc, data) VALUES (?, ?, ?)",
+                                 ((term, first_doc, data[bounds[i]:bounds[i + 1]])
+                                  for i, (term, first_doc) in enumerate(zip(run_terms, doc_ids[firsts].tolist()))))
+                conn.execute("DELETE FROM docs WHERE deleted = 1")
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("VACUUM")
+            return len(deleted)
+
+    def document_count(self):
+        with self.lock:
+            conn = self._connect()
+            return conn.execute("SELECT COUNT(*) FROM docs WHERE deleted = 0").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+# Search index of batch-processed documents (set SEARCH_INDEX=0 to disable)
+search_index = None
+if os.getenv("SEARCH_INDEX", "1") != "0":
+    search_index = SearchIndex(os.getenv("SEARCH_INDEX_PATH", os.path.join(".cache", "search_index.sqlite")))
+
+def search(query, k=10):
+    """Search the documents batch_processor has indexed (see SearchIndex.search)"""
+    if search_index is None:
+        return []
+    return search_index.search(query, k)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print('Usage: python doc_search.py "query"   |   python doc_search.py --compact')
+    elif search_index is None:
+        print("❌ Search index disabled (SEARCH_INDEX=0)")
+    elif sys.argv[1] == "--compact":
+        print(f"✅ Dropped {search_index.compact()} deleted document(s)")
+    else:
+        for rank, hit in enumerate(search(" ".join(sys.argv[1:])), 1):
+            print(f"{rank:>3}. {hit['score']:>7.3f}  {hit['filename']}")
@@ -0,0 +1,147 @@
+import re
+import zlib
+import difflib
+import numpy as np
+
+# Hashed feature space for paragraph vectors
+VECTOR_DIM = 4096
+# Paragraphs shorter than this are merged with the next one
+MIN_PARAGRAPH_CHARS = 200
+# Longer blocks (e.g. PDF text without blank lines) are split on lines
+MAX_PARAGRAPH_CHARS = 1500
+# Cosine similarity above which two paragraphs are the same text
+SAME_THRESHOLD = 0.95
+# Cosine similarity above which two paragraphs are versions of each other
+CHANGED_THRESHOLD = 0.5
+
+def split_paragraphs(text):
+    """Paragraphs of roughly MIN..MAX_PARAGRAPH_CHARS, split on blank lines, then lines"""
+    pieces = []
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if len(block) > MAX_PARAGRAPH_CHARS:
+            pieces.extend(line.strip() for line in block.split("\n") if line.strip())
+        elif block:
+            pieces.append(block)
+
+    paragraphs = []
+    current = ""
+    for piece in pieces:
+        current = f"{current}\n{piece}" if current else piece
+        if len(current) >= MIN_PARAGRAPH_CHARS:
+            paragraphs.append(current)
+            current = ""
+    if current:
+        if paragraphs and len(current) < MIN_PARAGRAPH_CHARS // 2:
+            paragraphs[-1] += "\n" + current
+        else:
+            paragraphs.append(current)
+    return paragraphs
+
+def paragraph_terms(paragraph):
+    """Words plus word-bigram shingles"""
+    words = re.findall(r"\w+", paragraph.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def tfidf_vectors(paragraphs):
+    """Hashed TF-IDF vectors (rows L2-normalized) for a list of paragraphs"""
+    counts = np.zeros((len(paragraphs), VECTOR_DIM), dtype=np.float32)
+    for row, paragraph in enumerate(paragraphs):
+        terms = paragraph_terms(paragraph)
+        if terms:
+            columns = np.fromiter((zlib.crc32(t.encode("utf-8")) % VECTOR_DIM for t in terms),
+                                  dtype=np.int64, count=len(terms))
+            np.add.at(counts[row], columns, 1.0)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(paragraphs)) / (1 + document_frequency)) + 1.0
+    vectors = np.log1p(counts) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+def normalized(paragraph):
+    return " ".join(re.findall(r"\w+", paragraph.lower()))
+
+def align_documents(text1, text2):
+    """
+    Line up the paragraphs of two documents
+    Identical runs are found with difflib (on normalized paragraphs); the
+    rest are paired by TF-IDF cosine similarity into "changed" pairs, and
+    whatever is left over is unique to one document
+    Returns a dict with shared, changed, only1, only2, stats and similarity
+    """
+    paragraphs1 = split_paragraphs(text1)
+    paragraphs2 = split_paragraphs(text2)
+    matcher = difflib.SequenceMatcher(
+        None, [normalized(p) for p in paragraphs1], [normalized(p) for p in paragraphs2], autojunk=False
+    )
+
+    shared = []
+    matched1, matched2 = set(), set()
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            shared.append(paragraphs1[block.a + k])
+            matched1.add(block.a + k)
+            matched2.add(block.b + k)
+
+    rest1 = [i for i in range(len(paragraphs1)) if i not in matched1]
+    rest2 = [j for j in range(len(paragraphs2)) if j not in matched2]
+    changed = []
+    similar_chars = 0.0
+    if rest1 and rest2:
+        vectors = tfidf_vectors([paragraphs1[i] for i in rest1] + [paragraphs2[j] for j in rest2])
+        similarity = vectors[:len(rest1)] @ vectors[len(rest1):].T
+        # Greedy best-first pairing: each paragraph is in at most one pair
+        for flat in np.argsort(similarity, axis=None)[::-1]:
+            a, b = divmod(int(flat), len(rest2))
+            score = float(similarity[a, b])
+            if score < CHANGED_THRESHOLD:
+                break
+            i, j = rest1[a], rest2[b]
+            if i in matched1 or j in matched2:
+                continue
+            matched1.add(i)
+            matched2.add(j)
+            similar_chars += score * (len(paragraphs1[i]) + len(paragraphs2[j]))
+            if score >= SAME_THRESHOLD:
+                shared.append(paragraphs1[i])
+            else:
+                changed.append((i, j, score))
+
+    changed.sort()
+    only1 = [paragraphs1[i] for i in range(len(paragraphs1)) if i not in matched1]
+    only2 = [paragraphs2[j] for j in range(len(paragraphs2)) if j not in matched2]
+
+    total_chars = len(text1) + len(text2)
+    shared_exact_chars = sum(2 * len(paragraphs1[block.a + k])
+                             for block in matcher.get_matching_blocks() for k in range(block.size))
+    similarity_score = (shared_exact_chars + similar_chars) / total_chars if total_chars else 1.0
+
+    return {
+        "shared": shared,
+        "changed": [(paragraphs1[i], paragraphs2[j], score) for i, j, score in changed],
+        "only1": only1,
+        "only2": only2,
+        "similarity": round(min(similarity_score, 1.0), 3),
+        "stats": {
+            "paragraphs_1": len(paragraphs1),
+            "paragraphs_2": len(paragraphs2),
+            "shared": len(shared),
+            "changed": len(changed),
+            "only_in_1": len(only1),
+            "only_in_2": len(only2)
+        }
+    }
+
+def shared_outline(paragraphs, max_chars):
+    """First sentence of each shared paragraph, up to max_chars in total"""
+    lines = []
+    used = 0
+    for paragraph in paragraphs:
+        first = re.split(r"(?<=[.!?])\s", paragraph.strip(), maxsplit=1)[0][:150]
+        if used + len(first) > max_chars:
+            lines.append(f"- ... ({len(paragraphs) - len(lines)} more shared paragraphs)")
+            break
+        lines.append(f"- {first}")
+        used += len(first)
+    return "\n".join(lines)
@@ -0,0 +1,328 @@
+import os
+import json
+import zlib
+import numpy as np
+from openai import OpenAI
+from dotenv import load_dotenv
+from text_extraction import read_document
+from llm_client import create_chat_completion, is_cached, response_cost, estimate_tokens, scheduler
+from chunked_summary import split_into_chunks
+from doc_similarity import paragraph_terms
+from extraction_cache import file_hash
+
+load_dotenv()
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+# Size of each retrievable chunk
+QA_CHUNK_TOKENS = 300
+# Chunks sent to the model with each question
+TOP_K = 5
+# Where chunk vectors are kept, one set of files per document content and embedder
+INDEX_FOLDER = os.getenv("QA_INDEX_PATH", os.path.join(".cache", "qa_index"))
+# "openai" or "hashing" (offline); openai falls back to hashing without an API key
+DEFAULT_EMBEDDER = os.getenv("QA_EMBEDDER", "openai")
+# Hashed feature space of the offline embedder
+HASHING_DIM = 2 ** 13
+# OpenAI embedding model, its price (USD per 1K tokens) and texts per request
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_COST_PER_1K = 0.00002
+EMBEDDING_BATCH = 256
+
+class HashingEmbedder:
+    """
+    Offline embedder: words + word bigrams hashed into HASHING_DIM columns
+    Counts are log-scaled; DocumentIndex adds IDF weights (idf = True)
+    """
+    idf = True
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self.cost = 0.0
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = paragraph_terms(text)
+            if terms:
+                columns = np.fromiter((zlib.crc32(t.encode("utf-8")) % self.dim for t in terms),
+                                      dtype=np.int64, count=len(terms))
+                vectors[row] = np.bincount(columns, minlength=self.dim)
+        return np.log1p(vectors)
+
+class OpenAIEmbedder:
+    """Embeddings API through the shared rate limiter; cost adds up in self.cost"""
+    idf = False
+
+    def __init__(self, client, model=EMBEDDING_MODEL):
+        self.client = client
+        self.model = model
+        self.name = f"openai-{model}"
+        self.cost = 0.0
+
+    def embed(self, texts):
+        vectors = []
+        for start in range(0, len(texts), EMBEDDING_BATCH):
+            batch = texts[start:start + EMBEDDING_BATCH]
+            response = scheduler.run(
+                lambda: self.client.embeddings.create(model=self.model, input=batch),
+                sum(estimate_tokens(text) for text in batch)
+            )
+            vectors.extend(item.embedding for item in response.data)
+            self.cost += (response.usage.total_tokens / 1000) * EMBEDDING_COST_PER_1K
+        return np.asarray(vectors, dtype=np.float32)
+
+def make_embedder(name=DEFAULT_EMBEDDER):
+    if name == "openai" and os.getenv("OPENAI_API_KEY"):
+        return OpenAIEmbedder(client)
+    if name not in ("openai", "hashing"):
+        raise ValueError(f"Unknown embedder: {name}")
+    return HashingEmbedder()
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+class DocumentIndex:
+    """
+    Chunk vectors of one document with top-k cosine search
+    Saved under INDEX_FOLDER as <content hash>.<embedder>.npy (L2-normalized
+    rows, memory-mapped when loaded), .chunks.json and, for IDF-weighted
+    embedders, .idf.npy; a document is only chunked and embedded once
+    """
+
+    def __init__(self, embedder, chunks, vectors, idf=None):
+        self.embedder = embedder
+        self.chunks = chunks
+        self.vectors = vectors
+        self.idf = idf
+
+    @staticmethod
+    def paths(content_hash, embedder, folder=INDEX_FOLDER):
+        base = os.path.join(folder, f"{content_hash}.{embedder.name}")
+        return base + ".npy", base + ".chunks.json", base + ".idf.npy"
+
+    @classmethod
+    def build(cls, text, embedder, paths=None):
+        chunks = split_into_chunks(text, QA_CHUNK_TOKENS)
+        vectors = embedder.embed(chunks) if chunks else np.zeros((0, 1), dtype=np.float32)
+        idf = None
+        if embedder.idf:
+            document_frequency = np.count_nonzero(vectors, axis=0)
+            idf = (np.log((1 + len(chunks)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+            vectors = vectors * idf
+        vectors = normalize_rows(vectors).astype(np.float32)
+
+        if paths is not None:
+            vectors_path, chunks_path, idf_path = paths
+            os.makedirs(os.path.dirname(vectors_path), exist_ok=True)
+            if idf is not None:
+                np.save(idf_path, idf)
+            with open(chunks_path, 'w', encoding='utf-8') as f:
+                json.dump(chunks, f, ensure_ascii=False)
+            # Vectors last: their presence marks a complete index
+            np.save(vectors_path + ".tmp.npy", vectors)
+            os.replace(vectors_path + ".tmp.npy", vectors_path)
+        return cls(embedder, chunks, vectors, idf)
+
+    @classmethod
+    def load(cls, paths, embedder):
+        vectors_path, chunks_path, idf_path = paths
+        if not os.path.exists(vectors_path):
+            return None
+        with open(chunks_path, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+        idf = np.load(idf_path) if embedder.idf else None
+        return cls(embedder, chunks, np.load(vectors_path, mmap_mode='r'), idf)
+
+    def search(self, question, k=TOP_K):
+        """The k chunks closest to the question as (score, chunk number), best first"""
+        if not self.chunks:
+            return []
+        query = self.embedder.embed([question])
+        if self.idf is not None:
+            query = query * self.idf
+        scores = np.asarray(self.vectors @ normalize_rows(query)[0])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(((float(scores[i]), int(i)) for i in top), reverse=True)
+
+def open_index(file_path, embedder=None):
+    """
+    Index for a document, loaded from disk or built (full text, no truncation)
+    If embedding fails, the offline hashing index is used instead (the one
+    saved by an earlier failure, or built now); later sessions try the
+    embedder again, so the document gets its real index once embedding works
+    Returns (index, embedding cost of building it now)
+    """
+    embedder = embedder or make_embedder()
+    content_hash = file_hash(file_path)
+    index = DocumentIndex.load(DocumentIndex.paths(content_hash, embedder), embedder)
+    if index is not None:
+        return index, 0.0
+
+    doc = read_document(file_path, verbose=False)
+    if not doc['success']:
+        raise ValueError(doc['error'])
+    try:
+        index = DocumentIndex.build(doc['text'], embedder, DocumentIndex.paths(content_hash, embedder))
+    except Exception as e:
+        if isinstance(embedder, HashingEmbedder):
+            raise
+        print(f"⚠️  Embedding failed ({e}), using offline hashing embedder")
+        fallback = HashingEmbedder()
+        paths = DocumentIndex.paths(content_hash, fallback)
+        index = DocumentIndex.load(paths, fallback) or DocumentIndex.build(doc['text'], fallback, paths)
+    # Whatever was embedded before a failure is still billed
+    return index, embedder.cost
+
+def build_answer_request(question, excerpts):
+    """Chat completion arguments answering a question from numbered excerpts only"""
+    context = "\n\n".join(f"[{i}] {excerpt}" for i, excerpt in enumerate(excerpts, 1))
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You answer questions about a document using only the excerpts provided. Cite excerpts like [1]. If the excerpts don't contain the answer, say so."},
+            {"role": "user", "content": f"Document excerpts:\n\n{context}\n\nQuestion: {question}"}
+        ],
+        "temperature": 0.2,
+        "max_tokens": 400
+    }
+
+def answer_question(index, question, k=TOP_K):
+    """
+    Answer a question from the k most relevant chunks of the document
+    Cost depends on k and the chunk size, not on the document's length
+    """
+    try:
+        embedding_cost = index.embedder.cost
+        hits = index.search(question, k)
+        embedding_cost = index.embedder.cost - embedding_cost
+        if not hits:
+            return {"success": False, "error": "Document has no text"}
+
+        response = create_chat_completion(
+            client, **build_answer_request(question, [index.chunks[i] for _, i in hits])
+        )
+        return {
+            "success": True,
+            "answer": response.choices[0].message.content,
+            "sources": [{"chunk": i + 1, "score": round(score, 3)} for score, i in hits],
+            "tokens": response.usage.total_tokens,
+            "cost": response_cost(response) + embedding_cost,
+            "cached": is_cached(response)
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def display_answer(result):
+    if not result['success']:
+        print(f"\n❌ Error: {result['error']}")
+        return
+
+    print("\n" + "┏" + "━"*68 + "┓")
+    print("┃ 💬 ANSWER" + " "*58 + "┃")
+    print("┣" + "━"*68 + "┫")
+
+    for line in result['answer'].split('\n'):
+        if not line.strip():
+            print("┃" + " "*68 + "┃")
+            continue
+        if len(line) <= 66:
+            print(f"┃ {line:<66} ┃")
+        else:
+            words = line.split()
+            current = ""
+            for word in words:
+                if len(current) + len(word) + 1 <= 66:
+                    current += word + " "
+                else:
+                    print(f"┃ {current.rstrip():<66} ┃")
+                    current = word + " "
+            if current:
+                print(f"┃ {current.rstrip():<66} ┃")
+
+    print("┣" + "━"*68 + "┫")
+    sources = ", ".join(f"#{s['chunk']} ({s['score']:.2f})" for s in result['sources'])
+    print(f"┃ {'📎 Chunks: ' + sources[:55]:<65} ┃")
+    print(f"┃ 📊 Tokens: {result['tokens']:<10} | 💰 Cost: ${result['cost']:.6f}" + " "*25 + "┃")
+    print("┗" + "━"*68 + "┛")
+
+def qa_session(file_path):
+    """
+    Interactive Q&A on one document until an empty question
+    Returns {"questions", "cost", "cache_hits"} for session statistics
+    """
+    stats = {"questions": 0, "cost": 0.0, "cache_hits": 0}
+
+    print(f"\n📖 Indexing {os.path.basename(file_path)}...")
+    try:
+        index, cost = open_index(file_path)
+    except Exception as e:
+        print(f"❌ Failed: {e}")
+        return stats
+
+    stats['cost'] += cost
+    print(f"✅ Index ready: {len(index.chunks)} chunks ({index.embedder.name}), embedding cost ${cost:.6f}")
+    print("\n💡 Ask questions about the document (press Enter to finish)")
+
+    while True:
+        question = input("\n❓ Question: ").strip()
+        if not question:
+            break
+
+        result = answer_question(index, question)
+        display_answer(result)
+        if result['success']:
+            stats['questions'] += 1
+            stats['cost'] += result['cost']
+            if result['cached']:
+                stats['cache_hits'] += 1
+
+    return stats
+
+def main():
+    """Main function"""
+    print("\n" + "="*70)
+    print("          💬 DOCUMENT Q&A 💬")
+    print("="*70)
+
+    test_folder = "test_documents"
+
+    if not os.path.exists(test_folder):
+        print(f"\n❌ Folder not found: {test_folder}")
+        return
+
+    files = [f for f in os.listdir(test_folder) if os.path.isfile(os.path.join(test_folder, f))]
+
+    if not files:
+        print("❌ No files found!")
+        return
+
+    print(f"\n📚 Available documents ({len(files)} found):")
+    for i, file in enumerate(files, 1):
+        print(f"   {i}. {file}")
+
+    choice = input(f"\nSelect document (1-{len(files)}): ").strip()
+
+    try:
+        idx = int(choice) - 1
+        if idx < 0 or idx >= len(files):
+            print("❌ Invalid choice!")
+            return
+    except ValueError:
+        print("❌ Please enter a number!")
+        return
+
+    stats = qa_session(os.path.join(test_folder, files[idx]))
+    print(f"\n📊 {stats['questions']} questions answered | 💰 Total cost: ${stats['cost']:.6f}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Program interrupted")
@@ -4,14 +4,24 @@ from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
 from text_extraction import read_document
+from llm_client import create_chat_completion, is_cached, response_cost
+from chunked_summary import map_reduce_summarize
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-def summarize_for_export(text):
-    """Generate a structured summary suitable for export"""
+# Characters of the document sent to the model (extraction stops here too)
+MAX_DOCUMENT_CHARS = 15000
+
+def build_export_request(text, max_chars=MAX_DOCUMENT_CHARS):
+    """
+    Build the chat completion arguments for a structured export summary
+    max_chars=None sends the text whole (merged chunk summaries are already
+    sized by the reduce step)
+    """
     
-    text = text[:15000]
+    if max_chars is not None:
+        text = text[:max_chars]
     
     prompt = """Create a structured summary of this document:
 
@@ -23,27 +33,39 @@ def summarize_for_export(text):
 
 Format with clear section headers."""
 
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You create well-structured summaries with clear sections."},
+            {"role": "user", "content": f"{prompt}\n\nDocument:\n{text}"}
+        ],
+        "temperature": 0.5,
+        "max_tokens": 600
+    }
+
+def summarize_for_export(text, chunked=False):
+    """
+    Generate a structured summary suitable for export
+    With chunked=True, text over MAX_DOCUMENT_CHARS is summarized in full via
+    content-defined chunks (unchanged chunks reuse cached summaries)
+    """
+    if chunked and len(text) > MAX_DOCUMENT_CHARS:
+        return map_reduce_summarize(client, text, lambda summaries: build_export_request(summaries, max_chars=None),
+                                    chunking="cdc")
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You create well-structured summaries with clear sections."},
-                {"role": "user", "content": f"{prompt}\n\nDocument:\n{text}"}
-            ],
-            temperature=0.5,
-            max_tokens=600
-        )
+        response = create_chat_completion(client, **build_export_request(text))
         
         summary = response.choices[0].message.content
         tokens = response.usage.total_tokens
-        cost = (response.usage.prompt_tokens / 1000) * 0.00015 + \
-               (response.usage.completion_tokens / 1000) * 0.0006
+        cost = response_cost(response)
         
         return {
             "success": True,
             "summary": summary,
             "tokens": tokens,
-            "cost": cost
+            "cost": cost,
+            "cached": is_cached(response)
         }
         
     except Exception as e:
@@ -326,7 +348,7 @@ def main():
     
     # Read document
     print(f"\n📖 Reading: {selected_file}")
-    doc_result = read_document(file_path)
+    doc_result = read_document(file_path, max_chars=MAX_DOCUMENT_CHARS)
     
     if not doc_result['success']:
         print(f"❌ Failed to read: {doc_result['error']}")
@@ -334,9 +356,19 @@ def main():
     
     print(f"✅ Loaded {doc_result['word_count']} words")
     
+    chunked = False
+    if doc_result.get('truncated'):
+        print(f"\n📏 Document is longer than {MAX_DOCUMENT_CHARS:,} characters")
+        chunked = input("   Summarize the full document in chunks? (y/n): ").strip().lower() == 'y'
+        if chunked:
+            doc_result = read_document(file_path, verbose=False)
+            if not doc_result['success']:
+                print(f"❌ Failed to read: {doc_result['error']}")
+                return
+    
     # Generate summary
     print("\n🔄 Generating structured summary...")
-    summary_result = summarize_for_export(doc_result['text'])
+    summary_result = summarize_for_export(doc_result['text'], chunked)
     
     if not summary_result['success']:
         print(f"❌ Summarization failed: {summary_result['error']}")
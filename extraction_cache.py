@@ -0,0 +1,71 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from disk_cache import DiskCache
+
+class ExtractionCache:
+    """
+    Two-level cache for read_document results (in-memory LRU + SQLite on disk)
+    Entries are keyed by absolute path, size and mtime, plus a SHA-256 of the
+    file contents when use_hash=True (catches edits that keep size and mtime)
+    """
+
+    def __init__(self, path, max_memory_entries=32, max_disk_bytes=1024 * 1024 * 1024, use_hash=False):
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.max_memory_entries = max_memory_entries
+        self.disk = DiskCache(path, max_bytes=max_disk_bytes, table="extractions")
+        self.use_hash = use_hash
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def key(self, file_path):
+        stat = os.stat(file_path)
+        parts = [os.path.abspath(file_path), str(stat.st_size), str(stat.st_mtime_ns)]
+        if self.use_hash:
+            parts.append(file_hash(file_path))
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, file_path):
+        """Return a cached extraction result or None"""
+        key = self.key(file_path)
+
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return dict(self.memory[key])
+
+        value = self.disk.get(key)
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+
+        result = json.loads(value)
+        self._remember(key, result)
+        self.stats["disk_hits"] += 1
+        return dict(result)
+
+    def put(self, file_path, result):
+        """Store a successful extraction result"""
+        if not result.get("success"):
+            return
+        key = self.key(file_path)
+        self._remember(key, dict(result))
+        self.disk.set(key, json.dumps(result, ensure_ascii=False))
+
+    def _remember(self, key, result):
+        with self.lock:
+            self.memory[key] = result
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_memory_entries:
+                self.memory.popitem(last=False)
+
+def file_hash(file_path, block_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
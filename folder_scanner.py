@@ -0,0 +1,129 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from text_extraction import SUPPORTED_EXTENSIONS
+from extraction_cache import file_hash
+
+# One scanned file; rel_path is relative to the scanned folder
+FileEntry = namedtuple("FileEntry", ["path", "rel_path", "size", "mtime_ns"])
+
+def scan_folder(folder_path, recursive=True, extensions=SUPPORTED_EXTENSIONS):
+    """
+    Yield a FileEntry for every supported file under folder_path
+    Uses os.scandir, whose entries carry file type (and on Windows, stat)
+    information from the directory listing; hidden files and folders are skipped
+    Entries come out sorted by name within each folder
+    """
+    root = os.path.abspath(folder_path)
+    pending = [root]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subfolders = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subfolders.append(entry.path)
+                continue
+            if not entry.is_file():
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in extensions:
+                continue
+            stat = entry.stat()
+            yield FileEntry(entry.path, os.path.relpath(entry.path, root), stat.st_size, stat.st_mtime_ns)
+
+        # Reversed so the stack visits subfolders in name order
+        pending.extend(reversed(subfolders))
+
+def file_entry(file_path, folder_path, extensions=SUPPORTED_EXTENSIONS):
+    """FileEntry for one path under folder_path, or None if it is gone, hidden or unsupported"""
+    root = os.path.abspath(folder_path)
+    rel_path = os.path.relpath(os.path.abspath(file_path), root)
+    if any(part.startswith('.') for part in rel_path.split(os.sep)):
+        return None
+    if os.path.splitext(file_path)[1].lower() not in extensions:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if not os.path.isfile(file_path):
+        return None
+    return FileEntry(os.path.join(root, rel_path), rel_path, stat.st_size, stat.st_mtime_ns)
+
+class FileManifest:
+    """
+    SQLite record of processed files (path, size, mtime, content hash)
+    so a rerun only processes new or modified files
+    Safe to share between threads (a batch run filters the scan in one
+    thread while recording finished files in another)
+    """
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT,
+            processed_at REAL NOT NULL
+        )""")
+        self.conn.commit()
+
+    def is_changed(self, entry):
+        """
+        True if the file is new or modified since it was last processed
+        When only the mtime moved (e.g. a copy or touch), the content hash decides
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (entry.path,)
+            ).fetchone()
+        if row is None:
+            return True
+
+        size, mtime_ns, content_hash = row
+        if size == entry.size and mtime_ns == entry.mtime_ns:
+            return False
+        if size != entry.size or content_hash is None:
+            return True
+
+        if file_hash(entry.path) != content_hash:
+            return True
+        # Same content, just a new mtime: remember it so we don't hash again
+        with self.lock:
+            self.conn.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (entry.mtime_ns, entry.path))
+            self.conn.commit()
+        return False
+
+    def mark_processed(self, entry, content_hash=None):
+        if content_hash is None:
+            content_hash = file_hash(entry.path)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, processed_at) VALUES (?, ?, ?, ?, ?)",
+                (entry.path, entry.size, entry.mtime_ns, content_hash, time.time())
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def changed_files(entries, manifest):
+    """Filter scanned entries down to new or modified files"""
+    for entry in entries:
+        if manifest.is_changed(entry):
+            yield entry
@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+from folder_scanner import scan_folder
+
+# Seconds between rescans when inotify is not available
+POLL_INTERVAL = 2.0
+# A file is processed once it has had no new events for this long
+DEBOUNCE_SECONDS = 1.0
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+class PollingWatcher:
+    """Finds changed files by rescanning the folder and comparing size/mtime"""
+
+    kind = "polling"
+
+    def __init__(self, folder_path, recursive=True, interval=POLL_INTERVAL):
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.interval = interval
+        self.snapshot = self.scan()
+        self.next_scan = time.monotonic() + interval
+
+    def scan(self):
+        return {entry.path: (entry.size, entry.mtime_ns)
+                for entry in scan_folder(self.folder_path, self.recursive)}
+
+    def wait(self, timeout=None):
+        """Block up to `timeout` seconds (None: until the next scan); return changed paths"""
+        now = time.monotonic()
+        if timeout is None or now + timeout >= self.next_scan:
+            time.sleep(max(0.0, self.next_scan - now))
+        else:
+            time.sleep(timeout)
+            return set()
+
+        self.next_scan = time.monotonic() + self.interval
+        snapshot = self.scan()
+        changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """Linux inotify watches on the folder (and subfolders); no rescanning"""
+
+    kind = "inotify"
+
+    def __init__(self, folder_path, recursive=True):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.libc = libc
+        self.recursive = recursive
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}
+        try:
+            self.add_folder(os.path.abspath(folder_path))
+        except OSError:
+            self.close()
+            raise
+
+    def add_folder(self, folder_path):
+        """Watch a folder (and, if recursive, everything below it)"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder_path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return
+        self.folders[wd] = folder_path
+        if not self.recursive:
+            return
+        try:
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                        self.add_folder(entry.path)
+        except OSError:
+            pass
+
+    def wait(self, timeout=None):
+        """Block up to `timeout` seconds (None: until an event); return changed paths"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        # Drain everything queued so one burst of writes comes back together
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            changed |= self.parse(data)
+        return changed
+
+    def parse(self, data):
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: report every file and let the manifest sort it out
+                for folder_path in list(self.folders.values()):
+                    changed |= {entry.path for entry in scan_folder(folder_path, recursive=False)}
+                continue
+            if mask & IN_IGNORED:
+                self.folders.pop(wd, None)
+                continue
+
+            folder_path = self.folders.get(wd)
+            if folder_path is None or not name or name.startswith('.'):
+                continue
+            path = os.path.join(folder_path, name)
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can land in a new folder before its watch exists
+                    self.add_folder(path)
+                    changed |= {entry.path for entry in scan_folder(path)}
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def make_watcher(folder_path, recursive=True, poll_interval=POLL_INTERVAL):
+    """inotify on Linux, otherwise (or if it can't be set up) polling"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder_path, recursive)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), polling every {poll_interval:g}s")
+    return PollingWatcher(folder_path, recursive, poll_interval)
+
+def watch_changes(watcher, debounce=DEBOUNCE_SECONDS):
+    """
+    Yield sorted lists of changed file paths, forever
+    A path is held back until it has been quiet for `debounce` seconds, so a
+    file still being written, or saved several times, is reported once
+    """
+    pending = {}
+    while True:
+        timeout = None
+        if pending:
+            timeout = max(0.0, min(pending.values()) + debounce - time.monotonic())
+
+        changed = watcher.wait(timeout)
+        now = time.monotonic()
+        for path in changed:
+            pending[path] = now
+
+        ready = sorted(path for path, last in pending.items() if now - last >= debounce)
+        for path in ready:
+            del pending[path]
+        if ready:
+            yield ready
@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from rate_limiter import RequestScheduler
+from disk_cache import DiskCache
+
+load_dotenv()
+
+# Rough size of a token in characters, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# gpt-4o-mini pricing (USD per 1K tokens)
+INPUT_COST_PER_1K = 0.00015
+OUTPUT_COST_PER_1K = 0.0006
+
+# One scheduler shared by every module so all LLM calls respect the same limits
+scheduler = RequestScheduler(
+    rpm=int(os.getenv("OPENAI_RPM", "500")),
+    tpm=int(os.getenv("OPENAI_TPM", "200000")),
+    initial_concurrency=int(os.getenv("OPENAI_INITIAL_CONCURRENCY", "4")),
+    max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "64")),
+    max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+)
+
+# Persistent response cache shared by every module (set LLM_CACHE=0 to disable)
+response_cache = None
+if os.getenv("LLM_CACHE", "1") != "0":
+    response_cache = DiskCache(
+        os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite")),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "500")) * 1024 * 1024,
+        table="responses"
+    )
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a piece of text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def estimate_request_tokens(request):
+    """Estimate prompt + completion tokens for a chat completion request"""
+    prompt_tokens = sum(estimate_tokens(m["content"]) for m in request["messages"])
+    return prompt_tokens + request.get("max_tokens", 0)
+
+def estimate_cost(prompt_tokens, completion_tokens):
+    """Cost of a request with the given token counts"""
+    return (prompt_tokens / 1000) * INPUT_COST_PER_1K + (completion_tokens / 1000) * OUTPUT_COST_PER_1K
+
+def response_cost(response):
+    """Cost of a chat completion response (cache hits have zero usage)"""
+    return (response.usage.prompt_tokens / 1000) * INPUT_COST_PER_1K + \
+           (response.usage.completion_tokens / 1000) * OUTPUT_COST_PER_1K
+
+def cache_key(request):
+    """Hash of everything that determines a response"""
+    key_data = {
+        "model": request.get("model"),
+        "messages": request.get("messages"),
+        "temperature": request.get("temperature"),
+        "max_tokens": request.get("max_tokens")
+    }
+    encoded = json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def cached_response(content):
+    """
+    Response-shaped object for a cache hit
+    Usage is zero so callers computing cost from usage report $0
+    """
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+        cached=True
+    )
+
+def lookup_cache(request):
+    if response_cache is None:
+        return None
+    value = response_cache.get(cache_key(request))
+    if value is None:
+        return None
+    return cached_response(json.loads(value)["content"])
+
+def store_cache(request, response):
+    content = response.choices[0].message.content
+    if response_cache is None or content is None:
+        return
+    response_cache.set(cache_key(request), json.dumps({
+        "content": content,
+        "prompt_tokens": response.usage.prompt_tokens,
+        "completion_tokens": response.usage.completion_tokens
+    }, ensure_ascii=False))
+
+def is_cached(response):
+    return getattr(response, "cached", False)
+
+def create_chat_completion(client, **request):
+    """
+    client.chat.completions.create() through the response cache
+    and the shared rate limiter
+    """
+    hit = lookup_cache(request)
+    if hit is not None:
+        return hit
+
+    response = scheduler.run(
+        lambda: client.chat.completions.create(**request),
+        estimate_request_tokens(request)
+    )
+    store_cache(request, response)
+    return response
+
+async def acreate_chat_completion(async_client, **request):
+    """Async version of create_chat_completion() for AsyncOpenAI clients"""
+    hit = lookup_cache(request)
+    if hit is not None:
+        return hit
+
+    response = await scheduler.run_async(
+        lambda: async_client.chat.completions.create(**request),
+        estimate_request_tokens(request)
+    )
+    store_cache(request, response)
+    return response
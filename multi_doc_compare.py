@@ -1,31 +1,118 @@
 import os
+import csv
+import json
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
 from text_extraction import read_document
+from llm_client import create_chat_completion, is_cached, response_cost
+from chunked_summary import run_requests, UsageTally
+from doc_similarity import align_documents, shared_outline
+from corpus_similarity import CorpusVectors, top_pairs
+from folder_scanner import scan_folder
+from extraction_cache import file_hash
+from digest_store import get_digest, put_digest, make_digest, digest_text
+from batch_pipeline import worker_pool, extract_in_worker, DEFAULT_EXTRACT_WORKERS
+from summary_request import build_summary_request, MAX_DOCUMENT_CHARS as SUMMARY_MAX_CHARS
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-def compare_documents(doc1_text, doc2_text, doc1_name, doc2_name):
+# Characters of each document sent to the model (extraction stops here too)
+COMPARE_MAX_CHARS = 15000
+SYNTHESIS_MAX_CHARS = 8000
+# Above this many documents, synthesis is done hierarchically in groups of this size
+SYNTHESIS_GROUP_SIZE = 5
+# Similarity above which compare_documents only sends the differences
+PREPASS_MIN_SIMILARITY = 0.3
+# Characters of outline standing in for the content both documents share
+SHARED_OUTLINE_CHARS = 2000
+# Corpus mode: text of each document used for its vector, pairs compared
+# by the model, and comparisons run at once
+CORPUS_MAX_CHARS = 50000
+CORPUS_TOP_K = 10
+CORPUS_COMPARE_WORKERS = 4
+
+def difference_sections(analysis, doc1_name, doc2_name):
+    """Prompt text for two similar documents: differences in full, shared content outlined"""
+    stats = analysis["stats"]
+    parts = [f"""Local analysis found these documents {analysis['similarity']:.0%} similar: {stats['shared']} paragraphs identical, {stats['changed']} changed, {stats['only_in_1']} only in Document 1, {stats['only_in_2']} only in Document 2.
+Differences are shown in full; content both documents share is only outlined."""]
+    
+    if analysis["shared"]:
+        parts.append(f"CONTENT SHARED BY BOTH (outline):\n{shared_outline(analysis['shared'], SHARED_OUTLINE_CHARS)}")
+    if analysis["changed"]:
+        changes = "\n\n".join(
+            f"[Change {i}]\nDocument 1 ({doc1_name}):\n{old}\n\nDocument 2 ({doc2_name}):\n{new}"
+            for i, (old, new, _) in enumerate(analysis["changed"], 1)
+        )
+        parts.append(f"CHANGED SECTIONS:\n{changes}")
+    if analysis["only1"]:
+        parts.append(f"ONLY IN DOCUMENT 1 ({doc1_name}):\n" + "\n\n".join(analysis["only1"]))
+    if analysis["only2"]:
+        parts.append(f"ONLY IN DOCUMENT 2 ({doc2_name}):\n" + "\n\n".join(analysis["only2"]))
+    return "\n\n".join(parts)
+
+def compare_documents(doc1_text, doc2_text, doc1_name, doc2_name, prepass=True):
     """
     Compare two documents and identify:
     - Similarities
     - Differences
     - Unique points in each
     - Overall relationship
+    With prepass=True, paragraphs are aligned locally first (doc_similarity);
+    when the documents are similar (e.g. two versions of a contract) only
+    the differing sections and an outline of the shared ones are sent
     """
     
     # Truncate if too long
-    doc1_truncated = doc1_text[:15000]
-    doc2_truncated = doc2_text[:15000]
+    doc1_truncated = doc1_text[:COMPARE_MAX_CHARS]
+    doc2_truncated = doc2_text[:COMPARE_MAX_CHARS]
     
-    prompt = f"""Compare these two documents and provide a structured analysis:
-
-Document 1 ({doc1_name}):
+    analysis = align_documents(doc1_truncated, doc2_truncated) if prepass else None
+    diff_only = analysis is not None and analysis["similarity"] >= PREPASS_MIN_SIMILARITY
+    if diff_only:
+        content = difference_sections(analysis, doc1_name, doc2_name)
+    else:
+        content = f"""Document 1 ({doc1_name}):
 {doc1_truncated}
 
 Document 2 ({doc2_name}):
-{doc2_truncated}
+{doc2_truncated}"""
+    
+    print("\n🔄 Comparing documents...")
+    
+    try:
+        response = create_chat_completion(client, **build_comparison_request(content))
+        
+        comparison = response.choices[0].message.content
+        tokens = response.usage.total_tokens
+        cost = response_cost(response)
+        
+        return {
+            "success": True,
+            "comparison": comparison,
+            "tokens": tokens,
+            "cost": cost,
+            "cached": is_cached(response),
+            "similarity": analysis["similarity"] if analysis else None,
+            "overlap": analysis["stats"] if analysis else None,
+            "diff_only": diff_only
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def build_comparison_request(content):
+    """Build the chat completion arguments for comparing two documents"""
+    
+    prompt = f"""Compare these two documents and provide a structured analysis:
+
+{content}
 
 Provide analysis in this format:
 
@@ -47,29 +134,64 @@ RELATIONSHIP:
 SUMMARY:
 - One paragraph summarizing the comparison"""
 
-    print("\n🔄 Comparing documents...")
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are an expert document analyst who compares documents precisely and identifies key relationships."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.4,
+        "max_tokens": 800
+    }
+
+def document_digest(file_path, name):
+    """
+    Digest (summary with its key points) of a document, from the digest store if
+    batch_processor or an earlier comparison already made one for this content
+    Otherwise the document is summarized once (same request as batch_processor)
+    and the digest stored, so later comparisons reuse it
+    Returns (digest, cost of making it now)
+    """
+    content_hash = file_hash(file_path)
+    digest = get_digest(content_hash)
+    if digest is not None:
+        return digest, 0.0
+    
+    result = read_document(file_path, verbose=False, max_chars=SUMMARY_MAX_CHARS)
+    if not result['success']:
+        raise ValueError(f"Could not read {name}: {result['error']}")
+    response = create_chat_completion(client, **build_summary_request(result['text']))
+    digest = make_digest(response.choices[0].message.content, name, "compare")
+    put_digest(content_hash, digest)
+    return digest, response_cost(response)
+
+def compare_digests(digest1, digest2, doc1_name, doc2_name):
+    """
+    Digest mode: compare two documents through their stored digests instead
+    of their full text (see document_digest)
+    """
+    content = f"""(Each document is given as a summary with its key points, not its full text.)
+
+Document 1 ({doc1_name}):
+{digest_text(digest1)}
+
+Document 2 ({doc2_name}):
+{digest_text(digest2)}"""
+    
+    print("\n🔄 Comparing document digests...")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert document analyst who compares documents precisely and identifies key relationships."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4,
-            max_tokens=800
-        )
-        
-        comparison = response.choices[0].message.content
-        tokens = response.usage.total_tokens
-        cost = (response.usage.prompt_tokens / 1000) * 0.00015 + \
-               (response.usage.completion_tokens / 1000) * 0.0006
-        
+        response = create_chat_completion(client, **build_comparison_request(content))
         return {
             "success": True,
-            "comparison": comparison,
-            "tokens": tokens,
-            "cost": cost
+            "comparison": response.choices[0].message.content,
+            "tokens": response.usage.total_tokens,
+            "cost": response_cost(response),
+            "cached": is_cached(response),
+            "similarity": None,
+            "overlap": None,
+            "diff_only": False,
+            "digest_mode": True
         }
         
     except Exception as e:
@@ -78,20 +200,12 @@ SUMMARY:
             "error": str(e)
         }
 
-def synthesize_multiple_docs(documents):
-    """
-    Synthesize information from 3+ documents into one coherent summary
-    """
-    
-    # Create combined text with labels
-    combined = ""
-    for i, (name, text) in enumerate(documents, 1):
-        truncated = text[:8000]  # Limit each doc
-        combined += f"\n\n=== DOCUMENT {i}: {name} ===\n{truncated}\n"
+def build_synthesis_request(sections, note=""):
+    """Build the chat completion arguments for a synthesis of labelled sections"""
     
     prompt = f"""Analyze these multiple documents and create a synthesis:
-
-{combined}
+{note}
+{sections}
 
 Provide:
 
@@ -108,30 +222,93 @@ CONNECTIONS:
 SYNTHESIS SUMMARY:
 - 2-3 paragraphs synthesizing all documents into a coherent narrative"""
 
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You synthesize information from multiple documents, finding connections and creating unified narratives."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.5,
+        "max_tokens": 1000
+    }
+
+def synthesize_multiple_docs(documents, hierarchical=False, group_size=SYNTHESIS_GROUP_SIZE):
+    """
+    Synthesize information from 3+ documents into one coherent summary
+    With hierarchical=True, see synthesize_hierarchical (for large document sets)
+    """
+    if hierarchical:
+        return synthesize_hierarchical(documents, group_size)
+    
+    # Create combined text with labels
+    combined = ""
+    for i, (name, text) in enumerate(documents, 1):
+        truncated = text[:SYNTHESIS_MAX_CHARS]  # Limit each doc
+        combined += f"\n\n=== DOCUMENT {i}: {name} ===\n{truncated}\n"
+    
     print(f"\n🔄 Synthesizing {len(documents)} documents...")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You synthesize information from multiple documents, finding connections and creating unified narratives."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=1000
-        )
+        response = create_chat_completion(client, **build_synthesis_request(combined))
         
         synthesis = response.choices[0].message.content
         tokens = response.usage.total_tokens
-        cost = (response.usage.prompt_tokens / 1000) * 0.00015 + \
-               (response.usage.completion_tokens / 1000) * 0.0006
+        cost = response_cost(response)
         
         return {
             "success": True,
             "synthesis": synthesis,
             "tokens": tokens,
-            "cost": cost
+            "cost": cost,
+            "cached": is_cached(response)
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
         }
+
+def label_sections(items, kind):
+    return "".join(f"\n\n=== {kind} {i}: {item['label']} ===\n{item['text']}\n" for i, item in enumerate(items, 1))
+
+def merge_group(group, kind, synthesis):
+    """Item for a group synthesis, labelled by its documents (first level) or document range"""
+    first = group[0]['first']
+    last = group[-1]['last']
+    if kind == "DOCUMENT":
+        label = ", ".join(item['label'] for item in group)
+    else:
+        label = f"{first} to {last}"
+    return {"label": label, "first": first, "last": last, "text": synthesis}
+
+def synthesize_hierarchical(documents, group_size=SYNTHESIS_GROUP_SIZE):
+    """
+    Tree-reduce synthesis for large document sets
+    1. Summarize each document (same request as batch_processor, so documents
+       it already summarized come from the response cache)
+    2. Synthesize groups of `group_size` in parallel, repeating on the group
+       syntheses until one group is left
+    3. Final synthesis in the usual MAIN THEMES / CONNECTIONS format
+    Every request stays bounded in size however many documents there are
+    """
+    if group_size < 2:
+        return {"success": False, "error": "group_size must be at least 2"}
+    
+    print(f"\n🔄 Synthesizing {len(documents)} documents hierarchically (groups of {group_size})...")
+    
+    tally = UsageTally()
+    try:
+        summaries = run_requests(
+            client,
+            [build_summary_request(text) for _, text in documents],
+            tally
+        )
+        items = [
+            {"label": name, "first": name, "last": name, "text": summary}
+            for (name, _), summary in zip(documents, summaries)
+        ]
+        return reduce_synthesis(items, group_size, tally)
         
     except Exception as e:
         return {
@@ -139,6 +316,183 @@ SYNTHESIS SUMMARY:
             "error": str(e)
         }
 
+def reduce_synthesis(items, group_size, tally, document_note=""):
+    """Synthesize per-document items, in groups of `group_size` while there are more than that"""
+    kind = "DOCUMENT"
+    levels = 0
+    
+    while len(items) > group_size:
+        groups = [items[i:i + group_size] for i in range(0, len(items), group_size)]
+        note = document_note if kind == "DOCUMENT" else "(Each section below is itself a synthesis of a group of documents.)"
+        syntheses = run_requests(
+            client,
+            [build_synthesis_request(label_sections(group, kind), note) for group in groups],
+            tally
+        )
+        items = [merge_group(group, kind, synthesis) for group, synthesis in zip(groups, syntheses)]
+        kind = "GROUP"
+        levels += 1
+        print(f"   Level {levels}: {len(items)} group syntheses")
+    
+    note = document_note if kind == "DOCUMENT" else (
+        "(Each section below is a synthesis of a group of documents; under KEY INSIGHTS "
+        "BY DOCUMENT, cover the documents named in each group.)"
+    )
+    response = create_chat_completion(client, **build_synthesis_request(label_sections(items, kind), note))
+    tally.add(response)
+    
+    return {
+        "success": True,
+        "synthesis": response.choices[0].message.content,
+        "tokens": tally.tokens,
+        "cost": tally.cost,
+        "cached": tally.cached_calls == tally.calls,
+        "levels": levels,
+        "llm_calls": tally.calls
+    }
+
+def synthesize_digests(named_digests, group_size=SYNTHESIS_GROUP_SIZE):
+    """
+    Digest mode: synthesize documents from their digests (see document_digest)
+    instead of their text; named_digests is a list of (name, digest)
+    """
+    if group_size < 2:
+        return {"success": False, "error": "group_size must be at least 2"}
+    
+    print(f"\n🔄 Synthesizing {len(named_digests)} document digests...")
+    
+    items = [
+        {"label": name, "first": name, "last": name, "text": digest_text(digest)}
+        for name, digest in named_digests
+    ]
+    try:
+        return reduce_synthesis(
+            items, group_size, UsageTally(),
+            "(Each section below is a summary of the document with its key points, not its full text.)"
+        )
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def compare_corpus(folder_path, top_k=CORPUS_TOP_K, mode="similar", recursive=True, digest=False):
+    """
+    Find related (or most different) documents across a whole folder
+    1. Hashed TF-IDF vector for every document, stored sparse
+    2. All-pairs cosine similarity in blocks, keeping only the top_k (bounded
+       memory, no n×n matrix)
+    3. compare_documents on only the top_k most similar (mode="similar")
+       or most divergent (mode="divergent") pairs, in parallel
+    With digest=True the pairs are compared through document digests, so a
+    document that appears in many pairs is summarized at most once; pairs
+    with a document whose digest can't be made are skipped and reported
+    Everything is exported to a corpus_<timestamp> folder: document order,
+    ranked pairs (CSV) and comparisons (JSON)
+    """
+    files = list(scan_folder(folder_path, recursive))
+    if len(files) < 2:
+        return {"success": False, "error": "Need at least 2 documents"}
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_folder = f"corpus_{timestamp}"
+    os.makedirs(output_folder)
+    names = [entry.rel_path for entry in files]
+    
+    print(f"\n📖 Vectorizing {len(files)} documents...")
+    vectors = CorpusVectors(len(files))
+    valid = []
+    with worker_pool(DEFAULT_EXTRACT_WORKERS) as pool:
+        doc_results = pool.map(extract_in_worker, [entry.path for entry in files],
+                               [CORPUS_MAX_CHARS] * len(files), chunksize=8)
+        for row, doc_result in enumerate(doc_results):
+            valid.append(doc_result['success'])
+            if doc_result['success']:
+                vectors.set_document(row, doc_result['text'])
+    corpus_rows = vectors.finish()
+    del vectors
+    print(f"✅ {sum(valid)} of {len(files)} documents readable")
+    
+    print("🧮 Computing pairwise similarities...")
+    most_similar, most_divergent = top_pairs(corpus_rows, top_k, valid)
+    del corpus_rows
+    pairs = most_similar if mode == "similar" else most_divergent
+    
+    digests = {}
+    digest_cost = 0.0
+    # Documents whose digest could not be made: name -> error
+    failed = {}
+    skipped = []
+    if digest:
+        rows = sorted({row for _, i, j in pairs for row in (i, j)})
+        print(f"📦 Loading digests for {len(rows)} documents...")
+        
+        def load_digest(row):
+            try:
+                return document_digest(files[row].path, names[row])
+            except Exception as e:
+                return None, str(e)
+        
+        with ThreadPoolExecutor(max_workers=CORPUS_COMPARE_WORKERS) as executor:
+            made = list(executor.map(load_digest, rows))
+        for row, (d, outcome) in zip(rows, made):
+            if d is None:
+                failed[names[row]] = outcome
+                print(f"⚠️  No digest for {names[row]}: {outcome}")
+            else:
+                digests[row] = d
+                digest_cost += outcome
+        skipped = [pair for pair in pairs if pair[1] not in digests or pair[2] not in digests]
+        pairs = [pair for pair in pairs if pair[1] in digests and pair[2] in digests]
+        if skipped:
+            print(f"⚠️  Skipping {len(skipped)} pair(s) with a document that has no digest")
+    
+    def compare_pair(pair):
+        score, i, j = pair
+        if digest:
+            return compare_digests(digests[i], digests[j], names[i], names[j])
+        doc1 = read_document(files[i].path, verbose=False, max_chars=COMPARE_MAX_CHARS)
+        doc2 = read_document(files[j].path, verbose=False, max_chars=COMPARE_MAX_CHARS)
+        for name, doc in ((names[i], doc1), (names[j], doc2)):
+            if not doc['success']:
+                return {"success": False, "error": f"Could not read {name}: {doc['error']}"}
+        return compare_documents(doc1['text'], doc2['text'], names[i], names[j])
+    
+    print(f"🔄 Comparing the {len(pairs)} most {mode} pairs...")
+    with ThreadPoolExecutor(max_workers=CORPUS_COMPARE_WORKERS) as executor:
+        comparisons = list(executor.map(compare_pair, pairs))
+    
+    ranked = [
+        {"rank": rank, "score": round(score, 4), "doc1": names[i], "doc2": names[j], "comparison": comparison}
+        for rank, ((score, i, j), comparison) in enumerate(zip(pairs, comparisons), 1)
+    ]
+    export_corpus_results(output_folder, names, ranked, mode)
+    
+    return {
+        "success": True,
+        "documents": len(files),
+        "pairs": ranked,
+        "output_folder": output_folder,
+        "cost": digest_cost + sum(c.get('cost', 0.0) for c in comparisons),
+        "failed": failed,
+        "skipped_pairs": [{"score": round(score, 4), "doc1": names[i], "doc2": names[j]}
+                          for score, i, j in skipped]
+    }
+
+def export_corpus_results(output_folder, names, ranked, mode):
+    """Write document order, ranked pairs (CSV) and their comparisons (JSON)"""
+    with open(os.path.join(output_folder, "documents.txt"), 'w', encoding='utf-8') as f:
+        f.write("\n".join(names) + "\n")
+    
+    with open(os.path.join(output_folder, "ranked_pairs.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "similarity", "document_1", "document_2"])
+        for pair in ranked:
+            writer.writerow([pair["rank"], pair["score"], pair["doc1"], pair["doc2"]])
+    
+    with open(os.path.join(output_folder, "comparisons.json"), 'w', encoding='utf-8') as f:
+        json.dump({"mode": mode, "pairs": ranked}, f, indent=2, ensure_ascii=False)
+
 def display_comparison(result, doc1_name, doc2_name):
     """Display comparison in formatted output"""
     if not result['success']:
@@ -174,6 +528,9 @@ def display_comparison(result, doc1_name, doc2_name):
                 print(f"┃ {current_line.rstrip():<66} ┃")
     
     print("┣" + "━"*68 + "┫")
+    if result.get('similarity') is not None:
+        sent = "differences only" if result['diff_only'] else "full text"
+        print(f"┃ {'🧮 Similarity: ' + format(result['similarity'], '.0%') + ' (sent ' + sent + ')':<65} ┃")
     print(f"┃ 📊 Tokens: {result['tokens']:<10} | 💰 Cost: ${result['cost']:.6f}" + " "*25 + "┃")
     print("┗" + "━"*68 + "┛")
 
@@ -241,8 +598,9 @@ def main():
     print("\n📋 Choose operation:")
     print("   1. Compare two documents")
     print("   2. Synthesize multiple documents (3+)")
+    print("   3. Find related documents across the whole folder")
     
-    operation = input("\nSelect operation (1 or 2): ").strip()
+    operation = input("\nSelect operation (1-3): ").strip()
     
     if operation == "1":
         # Two-document comparison
@@ -270,26 +628,44 @@ def main():
             print("❌ Please enter numbers!")
             return
         
-        # Read documents
-        print(f"\n📖 Reading documents...")
+        use_digests = input("Use digest mode (compare stored summaries)? (y/n): ").strip().lower() == 'y'
         
-        result1 = read_document(path1)
-        result2 = read_document(path2)
-        
-        if not result1['success'] or not result2['success']:
-            print("❌ Failed to read one or both documents!")
-            return
-        
-        print(f"✅ Loaded: {file1} ({result1['word_count']} words)")
-        print(f"✅ Loaded: {file2} ({result2['word_count']} words)")
-        
-        # Compare
-        comparison_result = compare_documents(
-            result1['text'], 
-            result2['text'],
-            file1,
-            file2
-        )
+        if use_digests:
+            print(f"\n📦 Loading digests...")
+            try:
+                digest1, cost1 = document_digest(path1, file1)
+                digest2, cost2 = document_digest(path2, file2)
+            except Exception as e:
+                print(f"❌ {e}")
+                return
+            
+            for file, cost in ((file1, cost1), (file2, cost2)):
+                print(f"✅ {file}: {'stored digest' if cost == 0 else f'summarized (${cost:.6f})'}")
+            
+            comparison_result = compare_digests(digest1, digest2, file1, file2)
+            if comparison_result['success']:
+                comparison_result['cost'] += cost1 + cost2
+        else:
+            # Read documents
+            print(f"\n📖 Reading documents...")
+            
+            result1 = read_document(path1, max_chars=COMPARE_MAX_CHARS)
+            result2 = read_document(path2, max_chars=COMPARE_MAX_CHARS)
+            
+            if not result1['success'] or not result2['success']:
+                print("❌ Failed to read one or both documents!")
+                return
+            
+            print(f"✅ Loaded: {file1} ({result1['word_count']} words)")
+            print(f"✅ Loaded: {file2} ({result2['word_count']} words)")
+            
+            # Compare
+            comparison_result = compare_documents(
+                result1['text'], 
+                result2['text'],
+                file1,
+                file2
+            )
         
         display_comparison(comparison_result, file1, file2)
         
@@ -312,6 +688,8 @@ def main():
                     f.write(comparison_result['comparison'])
                     f.write("\n\n" + "="*70 + "\n")
                     f.write(f"Cost: ${comparison_result['cost']:.6f}\n")
+                    if comparison_result['similarity'] is not None:
+                        f.write(f"Similarity: {comparison_result['similarity']:.0%}\n")
                 
                 print(f"✅ Saved to: {output}")
     
@@ -334,26 +712,55 @@ def main():
                 return
             
             documents = []
+            use_digests = input("Use digest mode (synthesize stored summaries)? (y/n): ").strip().lower() == 'y'
+            
+            if use_digests:
+                print(f"\n📦 Loading digests for {len(indices)} documents...")
+                named_digests = []
+                digest_cost = 0.0
+                for idx in indices:
+                    file = files[idx]
+                    try:
+                        digest, cost = document_digest(os.path.join(test_folder, file), file)
+                    except Exception as e:
+                        print(f"❌ {e}")
+                        continue
+                    named_digests.append((file, digest))
+                    documents.append((file, digest['summary']))
+                    digest_cost += cost
+                    print(f"✅ {file}: {'stored digest' if cost == 0 else f'summarized (${cost:.6f})'}")
+                
+                if len(named_digests) < 3:
+                    print("❌ Not enough documents loaded successfully!")
+                    return
+                
+                synthesis_result = synthesize_digests(named_digests)
+                if synthesis_result['success']:
+                    synthesis_result['cost'] += digest_cost
+            else:
+                # Large sets are summarized per document first, which needs more text of each
+                hierarchical = len(indices) > SYNTHESIS_GROUP_SIZE
+                max_chars = SUMMARY_MAX_CHARS if hierarchical else SYNTHESIS_MAX_CHARS
             
-            print(f"\n📖 Loading {len(indices)} documents...")
+                print(f"\n📖 Loading {len(indices)} documents...")
             
-            for idx in indices:
-                file = files[idx]
-                path = os.path.join(test_folder, file)
-                result = read_document(path)
+                for idx in indices:
+                    file = files[idx]
+                    path = os.path.join(test_folder, file)
+                    result = read_document(path, max_chars=max_chars)
                 
-                if result['success']:
-                    documents.append((file, result['text']))
-                    print(f"✅ Loaded: {file}")
-                else:
-                    print(f"❌ Failed to load: {file}")
+                    if result['success']:
+                        documents.append((file, result['text']))
+                        print(f"✅ Loaded: {file}")
+                    else:
+                        print(f"❌ Failed to load: {file}")
             
-            if len(documents) < 3:
-                print("❌ Not enough documents loaded successfully!")
-                return
+                if len(documents) < 3:
+                    print("❌ Not enough documents loaded successfully!")
+                    return
             
-            # Synthesize
-            synthesis_result = synthesize_multiple_docs(documents)
+                # Synthesize
+                synthesis_result = synthesize_multiple_docs(documents, hierarchical=hierarchical)
             display_synthesis(synthesis_result, len(documents))
             
             # Save option
@@ -383,6 +790,30 @@ def main():
             print("❌ Please enter valid numbers separated by commas!")
             return
     
+    elif operation == "3":
+        # Corpus mode
+        top_k = input(f"\nHow many pairs to compare in detail? (default {CORPUS_TOP_K}): ").strip()
+        top_k = int(top_k) if top_k.isdigit() and int(top_k) > 0 else CORPUS_TOP_K
+        mode = input("Most (s)imilar or most (d)ifferent pairs? (s/d): ").strip().lower()
+        mode = "divergent" if mode == "d" else "similar"
+        
+        use_digests = input("Use digest mode (compare stored summaries)? (y/n): ").strip().lower() == 'y'
+        
+        corpus_result = compare_corpus(test_folder, top_k, mode, digest=use_digests)
+        if not corpus_result['success']:
+            print(f"\n❌ Error: {corpus_result['error']}")
+            return
+        
+        print(f"\n🏆 Most {mode} pairs out of {corpus_result['documents']} documents:")
+        for pair in corpus_result['pairs']:
+            print(f"   {pair['rank']:>3}. {pair['score']:.3f}  {pair['doc1']}  ↔  {pair['doc2']}")
+        for name, error in corpus_result['failed'].items():
+            print(f"   ⚠️  {name}: {error}")
+        if corpus_result['skipped_pairs']:
+            print(f"   ⏭️  {len(corpus_result['skipped_pairs'])} pair(s) skipped (no digest)")
+        print(f"\n💰 Comparison cost: ${corpus_result['cost']:.6f}")
+        print(f"✅ Ranked pairs and comparisons saved to: {corpus_result['output_folder']}/")
+    
     else:
         print("❌ Invalid operation!")
 
@@ -0,0 +1,227 @@
+import time
+import random
+import asyncio
+import threading
+from openai import APIConnectionError, APIStatusError
+
+# HTTP statuses worth retrying (rate limits, timeouts, server errors)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Refilling bucket that allows `per_minute` units per minute
+    Used for both requests-per-minute and tokens-per-minute limits
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (0 if available now)"""
+        amount = min(amount, self.capacity)
+        self.refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Correct an earlier estimate once the real usage is known"""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+class AIMDConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight requests
+    Each success grows the limit by about one slot per window of requests,
+    each throttle halves it (at most once per cooldown period)
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=64, decrease_factor=0.5, cooldown=2.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.last_decrease = 0.0
+
+    def has_slot(self):
+        return self.in_flight < int(self.limit)
+
+    def acquire(self):
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def on_success(self):
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self):
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        self.last_decrease = now
+
+def retry_after_seconds(error):
+    """Read Retry-After (or retry-after-ms) from an API error, if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+def is_retryable(error):
+    """Rate limits, timeouts, connection drops and 5xx errors are retried"""
+    if isinstance(error, APIConnectionError):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+def is_throttle(error):
+    return isinstance(error, APIStatusError) and error.status_code == 429
+
+class RequestScheduler:
+    """
+    Shared scheduler for LLM calls
+    - requests-per-minute and tokens-per-minute token buckets
+    - AIMD limit on concurrent requests
+    - retries with jittered exponential backoff that honors Retry-After
+    Safe to use from threads and from asyncio code at the same time
+    """
+
+    def __init__(self, rpm=500, tpm=200000, initial_concurrency=4, max_concurrency=64,
+                 max_retries=6, base_delay=1.0, max_delay=60.0, poll_interval=0.05):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDConcurrency(initial=initial_concurrency, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "failed": 0
+        }
+
+    def _try_start(self, estimated_tokens):
+        """Take a slot and budget for one request, or return seconds to wait"""
+        with self.lock:
+            if not self.concurrency.has_slot():
+                return self.poll_interval
+
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                return wait
+
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self.concurrency.acquire()
+            self.stats["requests"] += 1
+            return 0.0
+
+    def _finish(self, response, estimated_tokens):
+        with self.lock:
+            self.concurrency.release()
+            self.concurrency.on_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.tokens.adjust(usage.total_tokens - estimated_tokens)
+
+    def _fail(self, error, attempt):
+        """Release the slot and decide how long to back off (None = give up)"""
+        with self.lock:
+            self.concurrency.release()
+            if is_throttle(error):
+                self.stats["throttled"] += 1
+                self.concurrency.on_throttle()
+
+            if not is_retryable(error) or attempt >= self.max_retries:
+                self.stats["failed"] += 1
+                return None
+
+            self.stats["retries"] += 1
+
+        delay = retry_after_seconds(error)
+        if delay is None:
+            # Full jitter keeps retrying clients from moving in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return min(delay, self.max_delay)
+
+    def _abort(self):
+        """Release the slot of a request that was interrupted (Ctrl+C, task cancelled)"""
+        with self.lock:
+            self.concurrency.release()
+
+    def run(self, request_fn, estimated_tokens=0):
+        """Call request_fn() under the rate limits, retrying transient errors"""
+        attempt = 0
+        while True:
+            wait = self._try_start(estimated_tokens)
+            while wait > 0:
+                time.sleep(min(wait, 1.0))
+                wait = self._try_start(estimated_tokens)
+
+            try:
+                response = request_fn()
+            except Exception as e:
+                delay = self._fail(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._abort()
+                raise
+
+            self._finish(response, estimated_tokens)
+            return response
+
+    async def run_async(self, request_fn, estimated_tokens=0):
+        """Async version of run(): request_fn() must return an awaitable"""
+        attempt = 0
+        while True:
+            wait = self._try_start(estimated_tokens)
+            while wait > 0:
+                await asyncio.sleep(min(wait, 1.0))
+                wait = self._try_start(estimated_tokens)
+
+            try:
+                response = await request_fn()
+            except Exception as e:
+                delay = self._fail(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._abort()
+                raise
+
+            self._finish(response, estimated_tokens)
+            return response
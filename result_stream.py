@@ -0,0 +1,69 @@
+import os
+import json
+import gzip
+import time
+
+# Flush the stream after this many records or seconds, whichever comes first
+FLUSH_RECORDS = 100
+FLUSH_SECONDS = 5.0
+
+class ResultStreamWriter:
+    """
+    Writes batch results to JSONL (optionally gzip) one line at a time
+    Aggregate statistics go to a small trailer file (<path>.stats.json)
+    written when the stream is closed
+    Writes are flushed in groups (FLUSH_RECORDS / FLUSH_SECONDS) so gzip
+    compresses whole blocks; a crash loses at most the unflushed tail, which
+    the resume journal still covers
+    """
+
+    def __init__(self, path, compress=False, append=False):
+        if compress and not path.endswith(".gz"):
+            path += ".gz"
+        self.path = path
+        self.count = 0
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+        # Appending to a .gz adds a new gzip member; readers see one stream
+        mode = 'a' if append else 'w'
+        if compress:
+            self.file = gzip.open(path, mode + 't', encoding='utf-8')
+        else:
+            self.file = open(path, mode, encoding='utf-8')
+
+    def write(self, result):
+        self.file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.count += 1
+        self.unflushed += 1
+        if self.unflushed >= FLUSH_RECORDS or time.monotonic() - self.last_flush >= FLUSH_SECONDS:
+            self.file.flush()
+            self.unflushed = 0
+            self.last_flush = time.monotonic()
+
+    def close(self, statistics):
+        self.file.close()
+        statistics = dict(statistics, results_file=os.path.basename(self.path), results=self.count)
+        with open(stats_path(self.path), 'w', encoding='utf-8') as f:
+            json.dump(statistics, f, indent=2, ensure_ascii=False)
+
+def stats_path(results_path):
+    return results_path + ".stats.json"
+
+def open_results(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+def iter_results(path):
+    """Yield results from a stream file one at a time"""
+    with open_results(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_stats(path):
+    """Read the trailer statistics for a stream file, or None if it was never closed"""
+    if not os.path.exists(stats_path(path)):
+        return None
+    with open(stats_path(path), 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,26 @@
+# Characters of each document sent to the model (extraction stops here too)
+MAX_DOCUMENT_CHARS = 20000
+
+def build_summary_request(text):
+    """Build the chat completion arguments for a batch summary"""
+    
+    # Truncate if needed
+    text = text[:MAX_DOCUMENT_CHARS]
+    
+    prompt = """Provide a concise summary of this document.
+Include:
+- Main topic (1 sentence)
+- Key points (3-5 bullet points)
+- Conclusion or outcome (1 sentence)
+
+Keep it brief and clear."""
+
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You create concise, accurate summaries quickly."},
+            {"role": "user", "content": f"{prompt}\n\nDocument:\n{text}"}
+        ],
+        "temperature": 0.4,
+        "max_tokens": 300
+    }
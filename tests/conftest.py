@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Keep the module-level caches and indexes out of the working directory
+for name in ("LLM_CACHE", "EXTRACTION_CACHE", "DIGEST_STORE", "SEARCH_INDEX"):
+    os.environ.setdefault(name, "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
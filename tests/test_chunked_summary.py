@@ -0,0 +1,39 @@
+import random
+from chunked_summary import content_defined_chunks, split_into_chunks, CHUNK_TOKENS
+from llm_client import CHARS_PER_TOKEN
+
+def make_text(seed, paragraphs=200):
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) for _ in range(paragraphs)
+    )
+
+def test_content_defined_chunks_cover_text():
+    text = make_text(1)
+    chunks = content_defined_chunks(text, target_tokens=200)
+    assert "".join(chunks) == text
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 * CHARS_PER_TOKEN * 2 + 200 for chunk in chunks)
+
+def test_content_defined_chunks_are_deterministic():
+    text = make_text(2)
+    assert content_defined_chunks(text, target_tokens=200) == content_defined_chunks(text, target_tokens=200)
+
+def test_edit_only_changes_nearby_chunks():
+    text = make_text(3)
+    before = content_defined_chunks(text, target_tokens=200)
+    middle = len(text) // 2
+    edited = text[:middle] + " inserted words here " + text[middle:]
+    after = content_defined_chunks(edited, target_tokens=200)
+
+    # Chunks before the edit are identical and most chunks after it line up again
+    shared = set(before) & set(after)
+    assert before[0] == after[0]
+    assert len(shared) >= len(before) - 3
+
+def test_split_into_chunks_respects_budget():
+    text = make_text(4)
+    chunks = split_into_chunks(text, max_tokens=CHUNK_TOKENS // 10)
+    assert all(len(chunk) <= CHUNK_TOKENS // 10 * CHARS_PER_TOKEN for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
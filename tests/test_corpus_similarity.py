@@ -0,0 +1,36 @@
+import random
+import numpy as np
+from corpus_similarity import CorpusVectors, top_pairs
+
+def make_rows(count=40, skip=()):
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(300)]
+    vectors = CorpusVectors(count)
+    for row in range(count):
+        if row not in skip:
+            vectors.set_document(row, " ".join(rng.choice(words) for _ in range(rng.randint(20, 200))))
+    return vectors.finish()
+
+def test_rows_are_normalized():
+    rows = make_rows(skip={3})
+    norms = np.linalg.norm(rows.dense(0, len(rows)), axis=1)
+    assert np.allclose(np.delete(norms, 3), 1.0, atol=1e-5)
+    assert norms[3] == 0
+
+def test_top_pairs_match_dense_similarities():
+    rows = make_rows()
+    dense = rows.dense(0, len(rows))
+    similarities = dense @ dense.T
+    i, j = np.triu_indices(len(rows), k=1)
+    best = np.argsort(-similarities[i, j])[:5]
+
+    most_similar, _ = top_pairs(rows, top_k=5, block_rows=7)
+    assert [(a, b) for _, a, b in most_similar] == [(int(i[t]), int(j[t])) for t in best]
+    assert np.allclose([score for score, _, _ in most_similar], similarities[i[best], j[best]], atol=1e-5)
+
+def test_invalid_rows_are_ignored():
+    rows = make_rows(skip={0})
+    valid = np.ones(len(rows), dtype=bool)
+    valid[0] = False
+    most_similar, most_divergent = top_pairs(rows, top_k=10, valid=valid, block_rows=8)
+    assert all(0 not in (a, b) for _, a, b in most_similar + most_divergent)
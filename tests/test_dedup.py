@@ -0,0 +1,63 @@
+import random
+import numpy as np
+from dedup import minhash, fingerprint, normalize_text, DuplicateIndex, NUM_PERM
+
+def make_text(seed, words=400):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(500)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+def test_minhash_is_deterministic():
+    text = make_text(1)
+    signature = minhash(text)
+    assert len(signature) == NUM_PERM
+    assert np.array_equal(signature, minhash(text))
+
+def test_normalization_ignores_case_and_punctuation():
+    assert normalize_text("Hello,   World!") == normalize_text("hello world")
+    assert fingerprint("Hello,   World!")[0] == fingerprint("hello world")[0]
+
+def test_exact_duplicate():
+    index = DuplicateIndex()
+    text = make_text(2)
+    assert index.add("a.txt", fingerprint(text)) is None
+    assert index.add("b.txt", fingerprint(text.upper())) == ("a.txt", "exact", 1.0)
+
+def test_near_duplicate():
+    index = DuplicateIndex()
+    text = make_text(3, words=2000)
+    words = text.split()
+    words[1000] = "changed"
+    index.add("a.txt", fingerprint(text))
+    canonical, kind, similarity = index.add("b.txt", fingerprint(" ".join(words)))
+    assert (canonical, kind) == ("a.txt", "near")
+    assert similarity >= 0.9
+
+def test_different_documents_are_kept():
+    index = DuplicateIndex()
+    assert index.add("a.txt", fingerprint(make_text(4))) is None
+    assert index.add("b.txt", fingerprint(make_text(5))) is None
+    assert index.duplicate_count() == 0
+
+def test_groups_record_members():
+    index = DuplicateIndex()
+    text = make_text(6)
+    index.add("a.txt", fingerprint(text))
+    index.add("b.txt", fingerprint(text))
+    index.add("c.txt", fingerprint(text))
+    assert [member["filename"] for member in index.groups["a.txt"]] == ["b.txt", "c.txt"]
+    assert index.duplicate_count() == 2
+
+def test_copy_of_near_duplicate_stays_near():
+    index = DuplicateIndex()
+    text = make_text(7, words=2000)
+    words = text.split()
+    words[1000] = "changed"
+    near = " ".join(words)
+    index.add("a.txt", fingerprint(text))
+    _, kind, similarity = index.add("b.txt", fingerprint(near))
+    assert kind == "near"
+
+    # Byte-identical to b.txt, but its text still differs from the canonical a.txt
+    assert index.add("c.txt", fingerprint(near)) == ("a.txt", "near", similarity)
+    assert index.groups["a.txt"][-1]["match"] == "near"
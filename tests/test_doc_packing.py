@@ -0,0 +1,27 @@
+import json
+from doc_packing import packed_request, parse_packed_response
+
+def reply(entries):
+    return json.dumps({"summaries": entries})
+
+def test_parses_summaries_in_document_order():
+    content = reply([{"id": 2, "summary": "second "}, {"id": 1, "summary": "first"}])
+    assert parse_packed_response(content, 2) == ["first", "second"]
+
+def test_rejects_missing_or_extra_documents():
+    assert parse_packed_response(reply([{"id": 1, "summary": "only"}]), 2) is None
+    assert parse_packed_response(reply([{"id": 1, "summary": "a"}, {"id": 3, "summary": "b"}]), 2) is None
+
+def test_rejects_empty_summaries():
+    assert parse_packed_response(reply([{"id": 1, "summary": "a"}, {"id": 2, "summary": "  "}]), 2) is None
+
+def test_rejects_malformed_replies():
+    assert parse_packed_response("not json", 1) is None
+    assert parse_packed_response(json.dumps({"other": []}), 1) is None
+    assert parse_packed_response(json.dumps({"summaries": [{"id": "x", "summary": "a"}]}), 1) is None
+    assert parse_packed_response(json.dumps({"summaries": [None]}), 1) is None
+
+def test_packed_request_scales_output_budget():
+    request = packed_request(["one", "two", "three"])
+    assert "=== DOCUMENT 3 ===" in request["messages"][1]["content"]
+    assert request["max_tokens"] == 3 * packed_request(["one"])["max_tokens"]
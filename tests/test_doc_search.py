@@ -0,0 +1,61 @@
+import numpy as np
+from doc_search import encode_varints, decode_varints, encode_postings, decode_postings, SearchIndex
+
+def test_varints_round_trip():
+    values = [0, 1, 127, 128, 255, 16383, 16384, 2 ** 31, 2 ** 62]
+    data, offsets = encode_varints(values)
+    assert decode_varints(data).tolist() == values
+    assert offsets[-1] == len(data)
+    assert np.diff(offsets).tolist() == [1, 1, 1, 2, 2, 2, 3, 5, 9]
+
+def test_varints_empty():
+    data, offsets = encode_varints([])
+    assert data == b""
+    assert offsets.tolist() == [0]
+
+def test_postings_round_trip_per_term():
+    term_ids = np.array([0, 0, 0, 1, 2, 2], dtype=np.int64)
+    doc_ids = np.array([3, 7, 300, 5, 1, 2], dtype=np.int64)
+    frequencies = np.array([1, 2, 200, 4, 5, 6], dtype=np.int64)
+    firsts, bounds, data = encode_postings(term_ids, doc_ids, frequencies)
+
+    assert firsts.tolist() == [0, 3, 4]
+    for run, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        docs, counts = decode_postings(data[start:end])
+        rows = term_ids == run
+        assert docs.tolist() == doc_ids[rows].tolist()
+        assert counts.tolist() == frequencies[rows].tolist()
+
+def test_postings_continue_from_previous_docs():
+    first = encode_postings(np.array([0, 0]), np.array([1, 4]), np.array([1, 1]))[2]
+    second = encode_postings(np.array([0]), np.array([9]), np.array([3]), [4])[2]
+    docs, counts = decode_postings(first + second)
+    assert docs.tolist() == [1, 4, 9]
+    assert counts.tolist() == [1, 1, 3]
+
+def test_search_ranks_and_reindexes(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.sqlite"))
+    index.add_document("a.txt", "the budget report for the quarter", filename="a.txt")
+    index.add_document("b.txt", "a poem about the sea", filename="b.txt")
+    index.add_document("c.txt", "budget budget budget overview", filename="c.txt")
+    assert [hit["filename"] for hit in index.search("budget")] == ["c.txt", "a.txt"]
+
+    index.add_document("c.txt", "now about the sea instead", filename="c.txt")
+    assert [hit["filename"] for hit in index.search("budget")] == ["a.txt"]
+    assert index.document_count() == 3
+    index.close()
+
+def test_compact_drops_deleted_documents(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.sqlite"))
+    for i in range(5):
+        index.add_document(f"{i}.txt", f"common word{i}")
+        index.flush()
+    index.add_document("1.txt", "common replaced")
+    index.remove_document("3.txt")
+    before = sorted(hit["path"] for hit in index.search("common"))
+
+    assert index.compact() == 2
+    assert sorted(hit["path"] for hit in index.search("common")) == before
+    assert [hit["filename"] for hit in index.search("replaced")] == ["1.txt"]
+    assert index.search("word3") == []
+    index.close()
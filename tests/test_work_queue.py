@@ -0,0 +1,55 @@
+import time
+from folder_scanner import FileEntry
+from work_queue import SQLiteWorkQueue
+
+def entry(rel_path, size=10, mtime_ns=1):
+    return FileEntry(rel_path, rel_path, size, mtime_ns)
+
+def make_queue(tmp_path, **kwargs):
+    return SQLiteWorkQueue(str(tmp_path / "queue.sqlite"), **kwargs)
+
+def test_enqueue_skips_unchanged_files(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue([entry("a.txt"), entry("b.txt")]) == 2
+    assert queue.enqueue([entry("a.txt"), entry("b.txt")]) == 0
+    assert queue.enqueue([entry("a.txt", mtime_ns=2)]) == 1
+    assert queue.counts() == {"pending": 2}
+
+def test_claim_hands_out_each_document_once(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([entry("a.txt")])
+    task_id, rel_path = queue.claim("w1")
+    assert rel_path == "a.txt"
+    assert queue.claim("w2") is None
+
+def test_expired_lease_is_claimable_again(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([entry("a.txt")])
+    task_id, _ = queue.claim("w1", lease_seconds=0.05)
+    time.sleep(0.1)
+
+    assert queue.claim("w2") == (task_id, "a.txt")
+    # The first worker lost its lease, so its late result is dropped
+    assert not queue.complete("w1", task_id, {"success": True, "cost": 0.0})
+    assert queue.complete("w2", task_id, {"success": True, "cost": 0.01})
+    assert queue.counts() == {"done": 1}
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue([entry("a.txt")])
+    task_id, _ = queue.claim("w1", lease_seconds=0.2)
+    time.sleep(0.1)
+    queue.heartbeat("w1", [task_id], lease_seconds=0.2)
+    time.sleep(0.15)
+    assert queue.claim("w2") is None
+
+def test_lease_expiring_too_often_fails_the_document(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue([entry("a.txt")])
+    for worker in ("w1", "w2"):
+        assert queue.claim(worker, lease_seconds=0.01) is not None
+        time.sleep(0.05)
+
+    assert queue.claim("w3") is None
+    (rel_path, result), = queue.results()
+    assert rel_path == "a.txt" and not result["success"]
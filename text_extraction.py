@@ -1,17 +1,74 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from PyPDF2 import PdfReader
 from docx import Document
+from extraction_cache import ExtractionCache
 
-def read_text_file(file_path):
-    """Read a plain text file"""
+# File types read_document understands
+SUPPORTED_EXTENSIONS = {'.txt', '.pdf', '.docx'}
+
+# Parsed PDF/DOCX results are cached so re-reading a file skips extraction
+# (set EXTRACTION_CACHE=0 to disable, EXTRACTION_CACHE_HASH=1 to also key on content)
+CACHED_EXTENSIONS = {'.pdf', '.docx'}
+extraction_cache = None
+if os.getenv("EXTRACTION_CACHE", "1") != "0":
+    extraction_cache = ExtractionCache(
+        os.getenv("EXTRACTION_CACHE_PATH", os.path.join(".cache", "extractions.sqlite")),
+        max_memory_entries=int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", "32")),
+        max_disk_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+        use_hash=os.getenv("EXTRACTION_CACHE_HASH", "0") == "1"
+    )
+
+# PDFs with at least this many pages are split across worker processes
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_THRESHOLD", "64"))
+# Worker processes for PDF extraction (0 = one per CPU core)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count() or 1
+# Page ranges handed out per worker, more ranges balance uneven pages better
+RANGES_PER_WORKER = 4
+# Rough characters per token, used to turn a token budget into a character budget
+CHARS_PER_TOKEN = 4
+# Typical text per PDF page, used to guess how many pages a budget needs
+ESTIMATED_CHARS_PER_PAGE = 2000
+
+# Block size for counting the words of a text file past the budget
+WORD_COUNT_BLOCK_CHARS = 1024 * 1024
+
+def count_remaining_words(file, previous):
+    """
+    Count the words in the rest of an open text file, `previous` being the
+    text read before it; returns (words, True if there was any text left)
+    """
+    words = 0
+    more = False
+    in_word = previous != "" and not previous[-1].isspace()
+    while True:
+        block = file.read(WORD_COUNT_BLOCK_CHARS)
+        if not block:
+            return words, more
+        more = True
+        words += len(block.split())
+        # A word cut by the block boundary was already counted
+        if in_word and not block[0].isspace():
+            words -= 1
+        in_word = not block[-1].isspace()
+
+def read_text_file(file_path, max_chars=None):
+    """
+    Read a plain text file (only the first max_chars characters if set)
+    word_count covers the whole file; words_read only the text returned
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+            content = file.read(max_chars if max_chars is not None else -1)
+            words_read = len(content.split())
+            remaining, truncated = count_remaining_words(file, content) if max_chars is not None else (0, False)
         return {
             "success": True,
             "text": content,
-            "word_count": len(content.split()),
-            "char_count": len(content)
+            "word_count": words_read + remaining,
+            "words_read": words_read,
+            "char_count": len(content),
+            "truncated": truncated
         }
     except Exception as e:
         return {
@@ -19,43 +76,140 @@ def read_text_file(file_path):
             "error": str(e)
         }
 
-def read_pdf_file(file_path):
-    """Read a PDF file"""
+def extract_page_range(task):
+    """Worker process: open the PDF and extract pages [start, end) in order"""
+    file_path, start, end = task
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def split_page_ranges(page_count, parts):
+    """Split 0..page_count into `parts` contiguous (start, end) ranges"""
+    size = -(-page_count // parts)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def iter_pages(file_path, workers=None, reader=None):
+    """
+    Yield (page_number, text) for each page of a PDF as it is extracted
+    Page numbers start at 1. Lets callers chunk and summarize early pages
+    while later pages are still being parsed
+    PDFs with PARALLEL_PAGE_THRESHOLD pages or more are extracted by a pool
+    of `workers` processes (default PDF_WORKERS); pages still come out in order
+    Pass a PdfReader already open on the file to avoid parsing it twice
+    """
+    reader = reader or PdfReader(file_path)
+    page_count = len(reader.pages)
+    workers = PDF_WORKERS if workers is None else workers
+    
+    if workers <= 1 or page_count < PARALLEL_PAGE_THRESHOLD:
+        for page_number, page in enumerate(reader.pages, 1):
+            yield page_number, page.extract_text() or ""
+        return
+    
+    ranges = split_page_ranges(page_count, workers * RANGES_PER_WORKER)
+    tasks = [(file_path, start, end) for start, end in ranges]
+    
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
     try:
+        page_number = 1
+        for texts in pool.map(extract_page_range, tasks):
+            for text in texts:
+                yield page_number, text
+                page_number += 1
+    finally:
+        # If the caller stopped early, drop the ranges not started yet and
+        # return without waiting for the ones still running
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def read_pdf_file(file_path, workers=None, max_chars=None):
+    """
+    Read a PDF file (see iter_pages for `workers`)
+    With max_chars, stops extracting pages once that many characters are read;
+    word_count is then extrapolated from the pages read over the total page
+    count (word_count_estimated=True), words_read counts the text returned
+    """
+    try:
+        # A small budget is met within the first few pages, no point starting a pool
+        if max_chars is not None and max_chars // ESTIMATED_CHARS_PER_PAGE < PARALLEL_PAGE_THRESHOLD:
+            workers = 1
+        
+        # Collect pages in a list and join once, counting as we go
+        pages = []
+        char_count = 0
         reader = PdfReader(file_path)
+        for page_number, page_text in iter_pages(file_path, workers, reader):
+            pages.append(page_text)
+            char_count += len(page_text) + 1
+            if max_chars is not None and char_count >= max_chars:
+                break
         
-        # Extract text from all pages
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        text = "\n".join(pages) + "\n" if pages else ""
         
-        return {
+        # The page count comes from the page tree, no text extraction needed
+        total_pages = len(reader.pages)
+        truncated = len(pages) < total_pages or (max_chars is not None and len(text) > max_chars)
+        page_words = len(text.split())
+        estimated = len(pages) < total_pages
+        # Extracting the remaining pages would cost what the budget saves
+        word_count = round(page_words * total_pages / len(pages)) if estimated else page_words
+        if max_chars is not None:
+            text = text[:max_chars]
+        
+        result = {
             "success": True,
             "text": text,
-            "pages": len(reader.pages),
-            "word_count": len(text.split()),
-            "char_count": len(text)
+            "pages": total_pages,
+            "pages_read": len(pages),
+            "word_count": word_count,
+            "words_read": len(text.split()),
+            "char_count": len(text),
+            "truncated": truncated
         }
+        if estimated:
+            result["word_count_estimated"] = True
+        return result
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
-def read_word_file(file_path):
-    """Read a Word document (.docx)"""
+def read_word_file(file_path, max_chars=None):
+    """
+    Read a Word document (.docx)
+    With max_chars, stops collecting paragraphs once that many characters are read;
+    word_count still covers every paragraph, words_read only the text returned
+    """
     try:
         doc = Document(file_path)
         
-        # Extract text from all paragraphs
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        # Extract text from paragraphs, up to the budget
+        paragraphs = []
+        char_count = 0
+        for paragraph in doc.paragraphs:
+            paragraphs.append(paragraph.text)
+            char_count += len(paragraph.text) + 1
+            if max_chars is not None and char_count >= max_chars:
+                break
+        
+        text = "\n".join(paragraphs)
+        truncated = len(paragraphs) < len(doc.paragraphs) or (max_chars is not None and len(text) > max_chars)
+        if max_chars is not None:
+            text = text[:max_chars]
+        
+        # The whole document is parsed already, so the full count is cheap
+        if truncated:
+            word_count = sum(len(paragraph.text.split()) for paragraph in doc.paragraphs)
+        else:
+            word_count = len(text.split())
         
         return {
             "success": True,
             "text": text,
             "paragraphs": len(doc.paragraphs),
-            "word_count": len(text.split()),
-            "char_count": len(text)
+            "word_count": word_count,
+            "words_read": len(text.split()),
+            "char_count": len(text),
+            "truncated": truncated
         }
     except Exception as e:
         return {
@@ -63,10 +217,33 @@ def read_word_file(file_path):
             "error": str(e)
         }
 
-def read_document(file_path):
+def apply_budget(result, max_chars):
+    """Trim an already extracted result down to max_chars, keeping its full word_count"""
+    if max_chars is None or len(result['text']) <= max_chars:
+        return result
+    
+    trimmed = dict(result)
+    trimmed['text'] = result['text'][:max_chars]
+    trimmed['words_read'] = len(trimmed['text'].split())
+    trimmed['char_count'] = len(trimmed['text'])
+    trimmed['truncated'] = True
+    return trimmed
+
+def covers_budget(result, max_chars):
+    """True if a cached result holds at least the first max_chars characters"""
+    if not result.get('truncated'):
+        return True
+    return max_chars is not None and result.get('max_chars') is not None and result['max_chars'] >= max_chars
+
+def read_document(file_path, verbose=True, use_cache=True, workers=None, max_chars=None, max_tokens=None):
     """
     Automatically detect file type and read it
     Supports: .txt, .pdf, .docx
+    Set verbose=False to skip the console statistics and preview
+    PDF/DOCX results come from the extraction cache when the file is unchanged
+    `workers` sets the number of processes used for large PDFs
+    max_chars / max_tokens stop extraction once the budget is met; the result
+    then has truncated=True but still reports the total page count
     """
     if not os.path.exists(file_path):
         return {
@@ -78,33 +255,59 @@ def read_document(file_path):
     _, extension = os.path.splitext(file_path)
     extension = extension.lower()
     
-    print(f"\n{'='*70}")
-    print(f"📄 Reading: {os.path.basename(file_path)}")
-    print(f"📋 Type: {extension}")
-    print('='*70)
+    if verbose:
+        print(f"\n{'='*70}")
+        print(f"📄 Reading: {os.path.basename(file_path)}")
+        print(f"📋 Type: {extension}")
+        print('='*70)
+    
+    if max_tokens is not None:
+        token_chars = max_tokens * CHARS_PER_TOKEN
+        max_chars = token_chars if max_chars is None else min(max_chars, token_chars)
+    
+    cache = extraction_cache if use_cache and extension in CACHED_EXTENSIONS else None
+    result = cache.get(file_path) if cache else None
+    if result is not None and not covers_budget(result, max_chars):
+        result = None
     
     # Read based on file type
-    if extension == '.txt':
-        result = read_text_file(file_path)
+    if result is not None:
+        result = apply_budget(result, max_chars)
+        result['cached'] = True
+    elif extension == '.txt':
+        result = read_text_file(file_path, max_chars)
     elif extension == '.pdf':
-        result = read_pdf_file(file_path)
+        result = read_pdf_file(file_path, workers, max_chars)
     elif extension == '.docx':
-        result = read_word_file(file_path)
+        result = read_word_file(file_path, max_chars)
     else:
         return {
             "success": False,
             "error": f"Unsupported file type: {extension}"
         }
     
+    if cache and not result.get('cached') and result['success']:
+        if result['truncated']:
+            result['max_chars'] = max_chars
+        cache.put(file_path, result)
+    
+    if not verbose:
+        return result
+    
     # Display results
     if result['success']:
-        print(f"\n✅ Successfully read document!")
+        print(f"\n✅ Successfully read document!" + (" (from cache)" if result.get('cached') else ""))
         print(f"📊 Statistics:")
         print(f"   - Characters: {result['char_count']:,}")
-        print(f"   - Words: {result['word_count']:,}")
+        approx = "~" if result.get('word_count_estimated') else ""
+        print(f"   - Words: {approx}{result['word_count']:,}")
+        if result.get('truncated') and 'words_read' in result:
+            print(f"   - Words read: {result['words_read']:,}")
         
         if 'pages' in result:
             print(f"   - Pages: {result['pages']}")
+            if result.get('truncated') and 'pages_read' in result:
+                print(f"   - Pages read: {result['pages_read']} (stopped at {max_chars:,} character budget)")
         if 'paragraphs' in result:
             print(f"   - Paragraphs: {result['paragraphs']}")
         
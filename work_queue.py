@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+# Seconds a claimed document stays reserved without a heartbeat
+LEASE_SECONDS = 120
+# Claims per document before it is marked failed for good
+MAX_ATTEMPTS = 3
+# Documents queued per write transaction, so other workers can claim in between
+ENQUEUE_BATCH = 500
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class WorkQueue(ABC):
+    """
+    Shared list of documents for any number of batch workers
+    Workers claim a document under a lease, keep it alive with heartbeats and
+    complete it; a lease that runs out (crashed worker, lost host) makes the
+    document claimable again. Each document holds exactly one result, so a
+    late or repeated completion never duplicates work in the report
+    Subclass this to back the queue with a queue server instead of SQLite
+    """
+
+    @abstractmethod
+    def enqueue(self, entries):
+        """Add scanned FileEntry items; changed files are queued again. Returns how many were queued"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id, lease_seconds=LEASE_SECONDS):
+        """Reserve the next document: (task id, relative path) or None if nothing is claimable"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, worker_id, task_ids, lease_seconds=LEASE_SECONDS):
+        """Extend the leases this worker still holds"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self, worker_id, task_id, result, content_hash=None):
+        """Store a result; returns False (and stores nothing) if the lease was lost"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, worker_id, task_id, error):
+        """Give a document back after a failure (failed for good after MAX_ATTEMPTS claims)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def counts(self):
+        """{status: number of documents}"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def results(self):
+        """(relative path, result) for every finished or failed document"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def worker_stats(self):
+        """Per-worker totals: list of dicts with worker, successful, failed, cost, cache_hits"""
+        raise NotImplementedError
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue in one SQLite file, shared by processes on one host or by
+    hosts on a network file system with working POSIX locks (claims use
+    BEGIN IMMEDIATE, so only one worker wins each document)
+    Rollback journal instead of WAL: WAL needs shared memory, which NFS lacks
+    """
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            rel_path TEXT UNIQUE NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            worker TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            content_hash TEXT,
+            result TEXT
+        )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status, lease_expires)")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS workers (
+            worker TEXT PRIMARY KEY,
+            last_seen REAL NOT NULL,
+            successful INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            cache_hits INTEGER NOT NULL DEFAULT 0
+        )""")
+
+    def _transaction(self, fn):
+        """Run fn(conn) inside one write transaction"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return value
+
+    def enqueue(self, entries):
+        # Scan the folder before locking the database, not inside the transaction
+        entries = list(entries)
+
+        def insert(batch, conn):
+            queued = 0
+            for entry in batch:
+                row = conn.execute("SELECT size, mtime_ns FROM tasks WHERE rel_path = ?",
+                                   (entry.rel_path,)).fetchone()
+                if row is None:
+                    conn.execute("INSERT INTO tasks (rel_path, size, mtime_ns, status) VALUES (?, ?, ?, 'pending')",
+                                 (entry.rel_path, entry.size, entry.mtime_ns))
+                elif row != (entry.size, entry.mtime_ns):
+                    conn.execute("""UPDATE tasks SET size = ?, mtime_ns = ?, status = 'pending', worker = NULL,
+                                    lease_expires = NULL, attempts = 0 WHERE rel_path = ?""",
+                                 (entry.size, entry.mtime_ns, entry.rel_path))
+                else:
+                    continue
+                queued += 1
+            return queued
+        queued = 0
+        for start in range(0, len(entries), ENQUEUE_BATCH):
+            batch = entries[start:start + ENQUEUE_BATCH]
+            queued += self._transaction(lambda conn: insert(batch, conn))
+        return queued
+
+    def claim(self, worker_id, lease_seconds=LEASE_SECONDS):
+        def take(conn):
+            now = time.time()
+            # A document whose worker keeps dying with it is not handed out forever
+            conn.execute("""UPDATE tasks SET status = 'failed', lease_expires = NULL,
+                            result = '{"success": false, "error": "Lease expired too many times"}'
+                            WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                         (now, self.max_attempts))
+            row = conn.execute("""SELECT id, rel_path FROM tasks
+                                  WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                                  ORDER BY id LIMIT 1""", (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("""UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?,
+                            attempts = attempts + 1 WHERE id = ?""",
+                         (worker_id, now + lease_seconds, row[0]))
+            self._touch_worker(conn, worker_id, now)
+            return row
+        return self._transaction(take)
+
+    def heartbeat(self, worker_id, task_ids, lease_seconds=LEASE_SECONDS):
+        def renew(conn):
+            now = time.time()
+            conn.executemany("UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                             [(now + lease_seconds, task_id, worker_id) for task_id in task_ids])
+            self._touch_worker(conn, worker_id, now)
+        self._transaction(renew)
+
+    def complete(self, worker_id, task_id, result, content_hash=None):
+        status = 'done' if result['success'] else 'failed'
+
+        def finish(conn):
+            updated = conn.execute("""UPDATE tasks SET status = ?, result = ?, content_hash = ?, lease_expires = NULL
+                                      WHERE id = ? AND worker = ? AND status = 'leased'""",
+                                   (status, json.dumps(result, ensure_ascii=False), content_hash,
+                                    task_id, worker_id)).rowcount
+            if not updated:
+                return False
+            self._touch_worker(conn, worker_id, time.time())
+            if result['success']:
+                conn.execute("""UPDATE workers SET successful = successful + 1, cost = cost + ?,
+                                cache_hits = cache_hits + ? WHERE worker = ?""",
+                             (result['cost'], 1 if result.get('cached') else 0, worker_id))
+            else:
+                conn.execute("UPDATE workers SET failed = failed + 1 WHERE worker = ?", (worker_id,))
+            return True
+        return self._transaction(finish)
+
+    def release(self, worker_id, task_id, error):
+        def give_back(conn):
+            row = conn.execute("SELECT attempts FROM tasks WHERE id = ? AND worker = ? AND status = 'leased'",
+                               (task_id, worker_id)).fetchone()
+            if row is None:
+                return
+            if row[0] >= self.max_attempts:
+                result = json.dumps({"success": False, "error": error}, ensure_ascii=False)
+                conn.execute("UPDATE tasks SET status = 'failed', result = ?, lease_expires = NULL WHERE id = ?",
+                             (result, task_id))
+                conn.execute("UPDATE workers SET failed = failed + 1 WHERE worker = ?", (worker_id,))
+            else:
+                conn.execute("UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL WHERE id = ?",
+                             (task_id,))
+        self._transaction(give_back)
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def results(self):
+        with self.lock:
+            rows = self.conn.execute("""SELECT rel_path, result FROM tasks
+                                        WHERE status IN ('done', 'failed') ORDER BY rel_path""").fetchall()
+        return [(rel_path, json.loads(result)) for rel_path, result in rows]
+
+    def worker_stats(self):
+        with self.lock:
+            rows = self.conn.execute("""SELECT worker, successful, failed, cost, cache_hits
+                                        FROM workers ORDER BY worker""").fetchall()
+        keys = ("worker", "successful", "failed", "cost", "cache_hits")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _touch_worker(self, conn, worker_id, now):
+        conn.execute("INSERT INTO workers (worker, last_seen) VALUES (?, ?) "
+                     "ON CONFLICT(worker) DO UPDATE SET last_seen = excluded.last_seen", (worker_id, now))
+
+    def close(self):
+        self.conn.close()
+
+class LeaseKeeper:
+    """Background thread that heartbeats every lease a worker holds"""
+
+    def __init__(self, queue, worker_id, lease_seconds=LEASE_SECONDS):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def hold(self, task_id):
+        with self.lock:
+            self.held.add(task_id)
+
+    def drop(self, task_id):
+        with self.lock:
+            self.held.discard(task_id)
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            with self.lock:
+                task_ids = list(self.held)
+            if not task_ids:
+                continue
+            try:
+                self.queue.heartbeat(self.worker_id, task_ids, self.lease_seconds)
+            except Exception as e:
+                # A locked or briefly unreachable queue must not end the heartbeats
+                print(f"⚠️  Lease heartbeat failed ({e}), retrying")
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()